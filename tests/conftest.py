@@ -17,7 +17,11 @@ class TestConfig:
     REDDIT_REDIRECT_URI = "http://localhost:5000/auth/callback"
     REDDIT_USER_AGENT = "TestAgent/1.0"
     REDDIT_SCOPES = ("identity", "history", "read", "save")
-    REDIS_URL = "redis://localhost:6379/0"
+    # No Redis in tests; the fake_redis fixture installs one when needed
+    REDIS_URL = None
+    SYNC_QUEUE_ASYNC = False
+    # Write API key usage immediately instead of from a background thread
+    API_KEY_USAGE_FLUSH_SECONDS = 0
     WTF_CSRF_ENABLED = False
 
 
@@ -31,6 +35,14 @@ def app():
         _db.drop_all()
 
 
+@pytest.fixture
+def fake_redis(app):
+    fakeredis = pytest.importorskip("fakeredis")
+    connection = fakeredis.FakeStrictRedis()
+    app.extensions["redis"] = connection
+    return connection
+
+
 @pytest.fixture
 def db(app):
     return _db
@@ -75,6 +87,25 @@ def saved_item(app, db, user):
     return item
 
 
+@pytest.fixture
+def make_item():
+    """Factory for saved items: make_item(user, reddit_id, **fields) adds and commits one."""
+    def make(user, reddit_id, **fields):
+        values = dict(
+            user_id=user.id, reddit_id=reddit_id, reddit_fullname=f"t3_{reddit_id}",
+            item_type="post", subreddit="homelab", author="a",
+            permalink=f"https://reddit.com/{reddit_id}", score=1,
+            created_utc=datetime(2024, 1, 1), title=f"Title {reddit_id}",
+            category="Self-Hosting & Homelab", is_self=True,
+        )
+        values.update(fields)
+        item = SavedItem(**values)
+        _db.session.add(item)
+        _db.session.commit()
+        return item
+    return make
+
+
 @pytest.fixture
 def api_key(app, db, user):
     raw_key, key_hash = generate_api_key()
@@ -1,6 +1,9 @@
 """Tests for API routes."""
 
 import json
+from datetime import datetime, timedelta
+from webapp.facets import get_facets, rebuild_facets
+from webapp.models import SavedItem
 
 
 def test_stats_unauthenticated(client):
@@ -60,3 +63,125 @@ def test_api_key_via_x_api_key_header(client, api_key):
     raw_key, _ = api_key
     resp = client.get("/api/stats", headers={"X-API-Key": raw_key})
     assert resp.status_code == 200
+
+
+def _add_items(make_item, user, count):
+    """Items i0.. a day apart, mixing type, subreddit and reviewed state."""
+    for i in range(count):
+        make_item(
+            user, f"i{i}", item_type="post" if i % 2 else "comment",
+            subreddit="homelab" if i % 3 else "python", score=i,
+            created_utc=datetime(2024, 1, 1) + timedelta(days=i),
+            title=f"Item {i}", selftext="long text " * 100, reviewed=i % 4 == 0,
+        )
+
+
+def test_list_items_defaults(client, api_key, user, make_item):
+    _add_items(make_item, user, 3)
+    raw_key, _ = api_key
+    data = client.get("/api/items", headers={"X-API-Key": raw_key}).get_json()
+    assert [i["reddit_id"] for i in data["items"]] == ["i2", "i1", "i0"]
+    assert "selftext" not in data["items"][0]
+    assert data["items"][0]["created_utc"] == "2024-01-03T00:00:00"
+    assert data["next_cursor"] is None
+
+
+def test_list_items_filters_and_fields(auth_client, user, make_item):
+    _add_items(make_item, user, 12)
+    data = auth_client.get(
+        "/api/items?subreddit=homelab&type=post&reviewed=false&since=2024-01-03&fields=reddit_id,score"
+    ).get_json()
+    assert data["items"] == [
+        {"reddit_id": "i11", "score": 11}, {"reddit_id": "i7", "score": 7}, {"reddit_id": "i5", "score": 5},
+    ]
+
+
+def test_list_items_cursor_paging(auth_client, user, make_item):
+    _add_items(make_item, user, 7)
+    seen, url = [], "/api/items?limit=3&fields=reddit_id"
+    while url:
+        data = auth_client.get(url).get_json()
+        seen += [i["reddit_id"] for i in data["items"]]
+        url = f"/api/items?limit=3&fields=reddit_id&cursor={data['next_cursor']}" if data["next_cursor"] else None
+    assert seen == [f"i{i}" for i in range(6, -1, -1)]
+
+
+def test_list_items_rejects_invalid_cursor(auth_client, user, make_item):
+    _add_items(make_item, user, 3)
+    for cursor in ("not-a-cursor", "Zm9vfGJhcg"):  # garbage, and base64 of "foo|bar"
+        resp = auth_client.get(f"/api/items?cursor={cursor}")
+        assert resp.status_code == 400
+        assert resp.get_json() == {"error": "Invalid cursor"}
+
+
+def test_list_items_text_query(auth_client, user, make_item):
+    _add_items(make_item, user, 3)
+    data = auth_client.get("/api/items?q=item 1&fields=reddit_id").get_json()
+    assert data["items"] == [{"reddit_id": "i1"}]
+
+
+def test_list_items_rejects_bad_params(auth_client):
+    assert auth_client.get("/api/items?fields=reddit_id,password").status_code == 400
+    assert auth_client.get("/api/items?reviewed=maybe").status_code == 400
+    assert auth_client.get("/api/items?since=yesterday").status_code == 400
+
+
+def test_bulk_state_by_ids(auth_client, db, user, make_item):
+    _add_items(make_item, user, 6)
+    get_facets(user.id)
+    resp = auth_client.post("/api/items/state", json={
+        "ids": ["i1", "i2", "missing"], "set": {"reviewed": True, "notes": "triaged"},
+    })
+    data = resp.get_json()
+    assert data["updated"] == 2
+    assert data["results"] == {"i1": "updated", "i2": "updated", "missing": "not_found"}
+    assert SavedItem.query.filter_by(notes="triaged").count() == 2
+
+    facets = get_facets(user.id)
+    rebuild_facets(user.id)
+    db.session.commit()
+    assert facets == get_facets(user.id)
+    assert facets["reviewed"] == {"": 4}  # i0 and i4 were already reviewed
+
+
+def test_bulk_state_by_filter(auth_client, user, make_item):
+    _add_items(make_item, user, 6)
+    resp = auth_client.post("/api/items/state", json={
+        "filter": {"subreddit": "python"}, "set": {"archived": True},
+    })
+    assert resp.get_json() == {"success": True, "updated": 2}
+    assert {i.reddit_id for i in SavedItem.query.filter_by(archived=True)} == {"i0", "i3"}
+
+
+def test_bulk_state_validation(auth_client):
+    assert auth_client.post("/api/items/state", json={"ids": ["a"]}).status_code == 400
+    assert auth_client.post("/api/items/state", json={"ids": ["a"], "set": {"score": 1}}).status_code == 400
+    assert auth_client.post("/api/items/state", json={
+        "ids": ["a"], "filter": {}, "set": {"reviewed": True}}).status_code == 400
+    assert auth_client.post("/api/items/state", json={
+        "filter": {"since": "soon"}, "set": {"reviewed": True}}).status_code == 400
+    assert auth_client.post("/api/items/state", json={
+        "ids": ["a"], "set": {"notes": ["not", "text"]}}).status_code == 400
+
+
+def test_bulk_state_rejects_malformed_bodies(auth_client):
+    for body in (
+        ["reviewed"],
+        {"ids": ["a"], "set": ["reviewed"]},
+        {"ids": [1, 2], "set": {"reviewed": True}},
+        {"filter": ["subreddit"], "set": {"reviewed": True}},
+        {"filter": {"subreddit": ["a"]}, "set": {"reviewed": True}},
+        {"filter": {"since": 20240101}, "set": {"reviewed": True}},
+    ):
+        assert auth_client.post("/api/items/state", json=body).status_code == 400
+
+
+def test_bulk_state_empty_filter_needs_all(auth_client, user, make_item):
+    _add_items(make_item, user, 3)
+    for filters in ({}, {"subreddit": ""}, {"unknown": "x"}):
+        resp = auth_client.post("/api/items/state", json={"filter": filters, "set": {"reviewed": True}})
+        assert resp.status_code == 400
+    assert SavedItem.query.filter_by(reviewed=True).count() == 1
+
+    resp = auth_client.post("/api/items/state", json={"filter": {}, "all": True, "set": {"reviewed": True}})
+    assert resp.get_json()["updated"] == 3
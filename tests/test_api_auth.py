@@ -1,6 +1,12 @@
 """Tests for API key authentication."""
 
-from webapp.api_auth import generate_api_key, verify_api_key
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+from flask import g
+from sqlalchemy import event
+from webapp.api_auth import (
+    KeyUsageBuffer, generate_api_key, get_key_usage, invalidate_api_key, verify_api_key,
+)
 
 
 def test_generate_api_key():
@@ -28,3 +34,65 @@ def test_verify_api_key_inactive(app, db, api_key):
     db.session.commit()
     user = verify_api_key(raw_key)
     assert user is None
+
+
+def test_verify_api_key_is_cached_until_invalidated(app, db, api_key):
+    raw_key, key_obj = api_key
+    assert verify_api_key(raw_key) is not None
+    # Deactivated behind the cache's back: still served from cache
+    db.session.execute(db.update(type(key_obj)).values(is_active=False))
+    db.session.commit()
+    assert verify_api_key(raw_key) is not None
+
+    invalidate_api_key(key_obj.key_hash)
+    assert verify_api_key(raw_key) is None
+
+
+def test_revoke_invalidates_cached_key(app, auth_client, api_key):
+    raw_key, key_obj = api_key
+    key_client = app.test_client()
+    headers = {"X-API-Key": raw_key}
+    assert key_client.get("/api/sync/status", headers=headers).status_code == 200
+    # The test app context (and so g) outlives requests; drop the user
+    # Flask-Login cached whenever the client switches
+    g.pop("_login_user", None)
+    assert auth_client.delete(f"/api/keys/{key_obj.id}").status_code == 200
+    g.pop("_login_user", None)
+    assert key_client.get("/api/sync/status", headers=headers).status_code == 401
+
+
+def test_authenticated_get_does_not_write(app, client, db, api_key):
+    raw_key, key_obj = api_key
+    usage = get_key_usage()
+    usage.interval = 3600
+
+    writes = []
+
+    def track(conn, cursor, statement, *args):
+        if statement.lstrip().upper().startswith(("UPDATE", "INSERT", "DELETE")):
+            writes.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", track)
+    try:
+        for _ in range(3):
+            assert client.get("/api/sync/status", headers={"X-API-Key": raw_key}).status_code == 200
+    finally:
+        event.remove(db.engine, "before_cursor_execute", track)
+    assert writes == []
+    assert key_obj.id in usage.pending()
+
+    assert usage.flush() == 1
+    db.session.refresh(key_obj)
+    assert key_obj.last_used_at is not None
+
+
+def test_usage_exit_hook_registered_once(app):
+    usage = KeyUsageBuffer(app, 3600)
+    dead = MagicMock()
+    dead.is_alive.return_value = False
+    with patch("webapp.api_auth.atexit.register") as register, \
+            patch("webapp.api_auth.threading.Thread", return_value=dead):
+        usage.record(1, datetime.utcnow())
+        usage.record(2, datetime.utcnow())
+    assert register.call_count == 1
+    assert dead.start.call_count == 2
@@ -1,19 +1,77 @@
 """Tests for app factory and configuration."""
 
+import sqlite3
+from unittest.mock import patch
 from webapp.app import create_app
 
+from .conftest import TestConfig
+
 
 def test_create_app():
-    from tests.conftest import TestConfig
     app = create_app(TestConfig)
     assert app is not None
     assert app.config["TESTING"] is True
 
 
 def test_create_app_has_blueprints():
-    from tests.conftest import TestConfig
     app = create_app(TestConfig)
     blueprint_names = list(app.blueprints.keys())
     assert "auth" in blueprint_names
     assert "views" in blueprint_names
     assert "api" in blueprint_names
+
+
+def test_create_app_adds_missing_columns(tmp_path):
+
+    db_path = tmp_path / "old.db"
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, reddit_id VARCHAR(20), username VARCHAR(50))")
+    conn.commit()
+    conn.close()
+
+    class OldDbConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{db_path}"
+
+    create_app(OldDbConfig)
+
+    conn = sqlite3.connect(db_path)
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(users)")}
+    conn.close()
+    assert "sync_high_water_mark" in columns
+    assert "last_sync_at" in columns
+
+
+def test_create_app_adds_missing_indexes(tmp_path):
+
+    class FileDbConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'old.db'}"
+
+    create_app(FileDbConfig)
+    conn = sqlite3.connect(tmp_path / "old.db")
+    conn.execute("DROP INDEX ix_saved_items_user_created")
+    conn.commit()
+    conn.close()
+
+    create_app(FileDbConfig)
+
+    conn = sqlite3.connect(tmp_path / "old.db")
+    indexes = {row[1] for row in conn.execute("PRAGMA index_list(saved_items)")}
+    conn.close()
+    assert "ix_saved_items_user_created" in indexes
+
+
+def test_create_app_backfills_previews_only_when_adding_the_column(tmp_path):
+
+    class FileDbConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'old.db'}"
+
+    create_app(FileDbConfig)
+    conn = sqlite3.connect(tmp_path / "old.db")
+    conn.execute("ALTER TABLE saved_items DROP COLUMN preview")
+    conn.commit()
+    conn.close()
+
+    with patch("webapp.app._backfill_previews") as backfill:
+        create_app(FileDbConfig)
+        create_app(FileDbConfig)
+    assert backfill.call_count == 1
@@ -0,0 +1,101 @@
+"""Tests for HTTP conditional caching."""
+
+from datetime import datetime, timedelta
+from webapp.cache import MemoryResultCache, RedisResultCache, bump_data_version, get_result_cache
+
+
+def test_stats_revalidates_with_304(auth_client, saved_item):
+    first = auth_client.get("/api/stats")
+    assert first.status_code == 200
+    assert first.headers["ETag"]
+    assert "no-cache" in first.headers["Cache-Control"]
+
+    again = auth_client.get("/api/stats", headers={"If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 304
+    assert again.headers["ETag"] == first.headers["ETag"]
+
+
+def test_state_change_invalidates_etag(auth_client, saved_item):
+    etag = auth_client.get("/api/stats").headers["ETag"]
+    auth_client.post(f"/api/item/{saved_item.reddit_id}/state", json={"reviewed": True})
+
+    resp = auth_client.get("/api/stats", headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.get_json()["reviewed"] == 1
+    assert resp.headers["ETag"] != etag
+
+
+def test_etag_differs_per_url(auth_client, saved_item):
+    assert auth_client.get("/").headers["ETag"] != auth_client.get("/?subreddit=homelab").headers["ETag"]
+
+
+def test_last_modified_validates(auth_client, db, user, saved_item):
+    bump_data_version(user.id)
+    db.session.commit()
+    first = auth_client.get("/")
+    last_modified = first.headers["Last-Modified"]
+
+    resp = auth_client.get("/", headers={"If-Modified-Since": last_modified})
+    assert resp.status_code == 304
+
+
+def test_sync_start_invalidates_etag(auth_client, db, user):
+    etag = auth_client.get("/api/sync/status").headers["ETag"]
+    user.sync_in_progress = True
+    user.sync_lease_expires_at = datetime.utcnow() + timedelta(minutes=5)
+    db.session.commit()
+
+    resp = auth_client.get("/api/sync/status", headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.get_json()["sync_in_progress"] is True
+
+
+def test_flash_messages_bypass_cache(auth_client, saved_item):
+    with auth_client.session_transaction() as sess:
+        sess["_flashes"] = [("success", "Logged in")]
+    resp = auth_client.get("/")
+    assert "ETag" not in resp.headers
+
+
+def test_memory_cache_lru_and_ttl():
+    cache = MemoryResultCache(max_entries=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)  # evicts b, the least recently used
+    assert cache.get("b") is None
+
+    cache.ttl = -1
+    cache.set("d", 4)
+    assert cache.get("d") is None
+    assert cache.snapshot() == {
+        "backend": "memory", "entries": 1, "hits": 1, "misses": 2, "evictions": 2, "expirations": 1,
+    }
+
+
+def test_cache_stats_endpoint_disabled_by_default(auth_client):
+    assert auth_client.get("/api/cache/stats").status_code == 404
+
+
+def test_search_results_cached_until_data_changes(app, auth_client, saved_item):
+    app.config["RESULT_CACHE_STATS_ENDPOINT"] = True
+    auth_client.get("/search?q=test")
+    auth_client.get("/search?q=test")
+    stats = auth_client.get("/api/cache/stats").get_json()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+    auth_client.post(f"/api/item/{saved_item.reddit_id}/state", json={"reviewed": True})
+    resp = auth_client.get("/search?q=test")
+    assert b"Reviewed" in resp.data
+    assert auth_client.get("/api/cache/stats").get_json()["misses"] == 2
+
+
+def test_redis_result_cache(app, fake_redis, auth_client, saved_item):
+    assert isinstance(get_result_cache(), RedisResultCache)
+    app.config["RESULT_CACHE_STATS_ENDPOINT"] = True
+    first = auth_client.get("/api/stats").get_json()
+    second = auth_client.get("/api/stats").get_json()
+    assert first == second
+    stats = auth_client.get("/api/cache/stats").get_json()
+    assert (stats["backend"], stats["hits"], stats["misses"]) == ("redis", 1, 1)
@@ -1,6 +1,13 @@
 """Tests for category mapping."""
 
-from webapp.categories import categorize_subreddit, get_all_categories, CATEGORIES
+import subprocess
+import sys
+
+import pytest
+
+from webapp.categories import (
+    CATEGORIES, _build_index, categorize_many, categorize_subreddit, get_all_categories,
+)
 
 
 def test_categorize_known_subreddit():
@@ -24,5 +31,29 @@ def test_categories_no_duplicate_subreddits():
     seen = {}
     for category, subs in CATEGORIES.items():
         for sub in subs:
-            assert sub not in seen, f"{sub} is in both '{seen[sub]}' and '{category}'"
-            seen[sub] = category
+            key = sub.casefold()
+            assert key not in seen, f"{sub} is in both '{seen[key]}' and '{category}'"
+            seen[key] = category
+
+
+def test_categorize_is_case_insensitive():
+    assert categorize_subreddit("HomeLab") == "Self-Hosting & Homelab"
+    assert categorize_subreddit("claudeai") == categorize_subreddit("ClaudeAI")
+
+
+def test_categorize_many_preserves_order():
+    assert categorize_many(["homelab", "nope", "HOMELAB", "nba"]) == [
+        "Self-Hosting & Homelab", "Uncategorized", "Self-Hosting & Homelab", "Sports",
+    ]
+    assert categorize_many([]) == []
+
+
+def test_index_rejects_conflicting_case_folded_names():
+    with pytest.raises(ValueError):
+        _build_index({"A": ["Homelab"], "B": ["homelab"]})
+    assert _build_index({"A": ["Homelab", "homelab"]}) == {"homelab": "A"}
+
+
+def test_categories_module_does_not_import_flask():
+    code = "import sys, webapp.categories; sys.exit('flask' in sys.modules)"
+    assert subprocess.run([sys.executable, "-c", code]).returncode == 0
@@ -0,0 +1,59 @@
+"""Tests for streaming exports."""
+
+import csv
+import gzip
+import io
+import json
+from datetime import datetime
+
+
+def test_export_ndjson_streams_all_fields(auth_client, user, make_item):
+    make_item(user, "a1", selftext="Body text", notes="keep")
+    make_item(user, "a2", created_utc=datetime(2024, 2, 1))
+    resp = auth_client.get("/api/export?format=ndjson")
+    assert resp.is_streamed
+    assert resp.mimetype == "application/x-ndjson"
+    rows = [json.loads(line) for line in resp.get_data(as_text=True).splitlines()]
+    assert [r["id"] for r in rows] == ["a2", "a1"]
+    assert rows[1]["selftext"] == "Body text"
+    assert rows[1]["notes"] == "keep"
+
+
+def test_export_json_and_csv(auth_client, user, make_item):
+    make_item(user, "a1", title='Quote "and, comma"')
+    data = json.loads(auth_client.get("/api/export?format=json").get_data(as_text=True))
+    assert data[0]["title"] == 'Quote "and, comma"'
+
+    text = auth_client.get("/api/export?format=csv").get_data(as_text=True)
+    rows = list(csv.DictReader(io.StringIO(text)))
+    assert rows[0]["title"] == 'Quote "and, comma"'
+
+
+def test_export_json_empty(auth_client):
+    assert json.loads(auth_client.get("/api/export?format=json").get_data(as_text=True)) == []
+
+
+def test_export_markdown_groups_by_category_and_subreddit(auth_client, user, make_item):
+    make_item(user, "a1", selftext="Self text")
+    make_item(user, "a2", subreddit="selfhosted", is_self=False, url="https://example.com")
+    make_item(user, "c1", item_type="comment", category="Programming", subreddit="python",
+         body="A comment", post_title="Parent")
+    text = auth_client.get("/api/export?format=markdown").get_data(as_text=True)
+    assert text.index("## Self-Hosting & Homelab (2)") < text.index("## Programming (1)")
+    assert "### r/homelab (1)" in text
+    assert "> Self text" in text
+    assert "🔗 https://example.com" in text
+    assert "#### [Comment on: Parent](https://reddit.com/c1)" in text
+
+
+def test_export_gzip_and_filters(auth_client, user, make_item):
+    make_item(user, "a1")
+    make_item(user, "a2", subreddit="selfhosted")
+    resp = auth_client.get("/api/export?format=ndjson&gzip=1&subreddit=selfhosted")
+    assert resp.headers["Content-Disposition"] == 'attachment; filename="reddit-saved.ndjson.gz"'
+    rows = gzip.decompress(resp.get_data()).decode().splitlines()
+    assert [json.loads(r)["id"] for r in rows] == ["a2"]
+
+
+def test_export_rejects_unknown_format(auth_client):
+    assert auth_client.get("/api/export?format=xml").status_code == 400
@@ -0,0 +1,91 @@
+"""Tests for materialized facet counts."""
+
+from unittest.mock import patch
+from sqlalchemy import insert
+from webapp.facets import get_facets, rebuild_facets, rebuild_facets_command
+from webapp.models import SavedItem, UserFacet
+from webapp.sync import RedditSyncService, unsave_user_item
+
+from .test_sync import _comment, _listing, _post
+
+
+def _rebuilt(db, user_id):
+    rebuild_facets(user_id)
+    db.session.commit()
+    return get_facets(user_id)
+
+
+def test_get_facets_builds_lazily(app, user, saved_item):
+    assert UserFacet.query.count() == 0
+    facets = get_facets(user.id)
+    assert facets["total"] == {"": 1}
+    assert facets["subreddit"] == {"homelab": 1}
+    assert facets["reviewed"] == {}
+
+
+def test_get_facets_survives_a_concurrent_first_build(app, db, user, saved_item):
+
+    def racing_rebuild(user_id):
+        # Another request builds and commits the rows first...
+        rebuild_facets(user_id)
+        db.session.commit()
+        # ...so this one's insert hits their primary keys
+        db.session.execute(insert(UserFacet), [{"user_id": user_id, "facet": "total", "value": "", "count": 1}])
+
+    with patch("webapp.facets.rebuild_facets", side_effect=racing_rebuild):
+        facets = get_facets(user.id)
+    assert facets["total"] == {"": 1}
+    assert facets["subreddit"] == {"homelab": 1}
+
+
+def test_sync_and_prune_keep_facets_in_step(app, db, user, saved_item):
+    get_facets(user.id)
+    service = RedditSyncService(user, {"SYNC_PRUNE_MAX_FRACTION": 1})
+    pages = [_listing([_post("p1", subreddit="selfhosted"), _comment("c1")])]
+    with patch.object(service, "_make_request", side_effect=pages):
+        service.sync_saved_items(full_sync=True)
+
+    facets = get_facets(user.id)
+    assert facets["total"] == {"": 2}
+    assert facets["subreddit"] == {"selfhosted": 1, "ClaudeAI": 1}
+    assert facets["item_type"] == {"post": 1, "comment": 1}
+    assert facets == _rebuilt(db, user.id)
+
+
+def test_state_change_updates_facets(auth_client, db, user, saved_item):
+    get_facets(user.id)
+    auth_client.post(f"/api/item/{saved_item.reddit_id}/state", json={"reviewed": True, "archived": True})
+    assert get_facets(user.id)["reviewed"] == {"": 1}
+
+    auth_client.post(f"/api/item/{saved_item.reddit_id}/state", json={"reviewed": False})
+    facets = get_facets(user.id)
+    assert facets["reviewed"] == {}
+    assert facets["archived"] == {"": 1}
+    assert facets == _rebuilt(db, user.id)
+
+
+def test_unsave_decrements_facets(app, db, user, saved_item):
+    get_facets(user.id)
+    with patch.object(RedditSyncService, "unsave_item", return_value=True):
+        assert unsave_user_item(user.id, saved_item.reddit_id) == {"status": "success"}
+    facets = get_facets(user.id)
+    assert facets["total"] == {"": 0}
+    assert facets["subreddit"] == {}
+
+
+def test_stats_reads_facets(auth_client, saved_item):
+    data = auth_client.get("/api/stats").get_json()
+    assert data["total"] == 1
+    assert data["reviewed"] == 0
+    assert data["by_type"] == {"post": 1}
+    assert data["categories"] == 1
+
+
+def test_rebuild_facets_command_repairs_drift(app, db, user, saved_item):
+    get_facets(user.id)
+    UserFacet.query.filter_by(facet="total").update({"count": 99})
+    db.session.commit()
+
+    result = app.test_cli_runner().invoke(rebuild_facets_command)
+    assert "1 user" in result.output
+    assert get_facets(user.id)["total"] == {"": SavedItem.query.count()}
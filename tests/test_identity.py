@@ -0,0 +1,51 @@
+"""Tests for the cached identity user loader."""
+
+from flask import g
+from sqlalchemy import event
+
+from webapp.identity import CachedUser, load_identity
+
+
+def _count_queries(db):
+    statements = []
+    event.listen(db.engine, "before_cursor_execute",
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+    return statements
+
+
+def test_identity_is_cached_without_tokens(app, user):
+    identity = load_identity(user.id)
+    assert isinstance(identity, CachedUser)
+    assert (identity.id, identity.username) == (user.id, "testuser")
+    assert not hasattr(identity, "access_token")
+    assert not hasattr(identity, "refresh_token")
+    assert load_identity(user.id) is identity
+    assert load_identity(999) is None
+
+
+def test_page_views_skip_user_query_once_cached(app, db, auth_client, saved_item):
+    auth_client.get("/")
+    g.pop("_login_user", None)
+
+    statements = _count_queries(db)
+    resp = auth_client.get("/")
+    assert resp.status_code == 200
+    assert b"u/testuser" in resp.data
+    assert not any("FROM users" in s and "users.username" in s for s in statements)
+
+
+def test_api_key_auth_uses_cached_identity(client, api_key):
+    raw_key, _ = api_key
+    resp = client.get("/api/sync/status", headers={"X-API-Key": raw_key})
+    assert resp.status_code == 200
+    assert isinstance(g.api_user, CachedUser)
+
+
+def test_logout_invalidates_identity(app, db, auth_client, user):
+    auth_client.get("/")
+    user.username = "renamed"
+    db.session.commit()
+    assert load_identity(user.id).username == "testuser"
+
+    auth_client.get("/auth/logout")
+    assert load_identity(user.id).username == "renamed"
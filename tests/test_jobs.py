@@ -0,0 +1,98 @@
+"""Tests for the background sync job queue."""
+
+import json
+
+import pytest
+from unittest.mock import patch
+from webapp.jobs import InProcessQueue, RedisQueue, enqueue_sync, get_job, get_sync_queue
+
+
+def test_in_process_queue_without_redis(app):
+    assert isinstance(get_sync_queue(), InProcessQueue)
+
+
+def test_enqueue_sync_runs_job(app, user):
+    with patch("webapp.sync.sync_user_items", return_value={"status": "success", "new_items": 2}) as sync:
+        job_id = enqueue_sync(user.id, True)
+
+    sync.assert_called_once_with(user.id, True, "saved", None, False)
+    job = get_job(job_id)
+    assert job["status"] == "finished"
+    assert job["user_id"] == user.id
+    assert job["result"]["new_items"] == 2
+
+
+def test_failed_job_reports_error(app, user):
+    with patch("webapp.sync.sync_user_items", side_effect=RuntimeError("boom")):
+        job_id = enqueue_sync(user.id)
+
+    job = get_job(job_id)
+    assert job["status"] == "failed"
+    assert job["result"] == {"error": "boom"}
+
+
+def test_get_job_unknown(app):
+    assert get_job("missing") is None
+
+
+def test_in_process_job_status_is_visible_to_other_workers(app, user):
+    with patch("webapp.sync.sync_user_items", return_value={"status": "success", "new_items": 3}):
+        job_id = enqueue_sync(user.id)
+
+    # Another gunicorn worker has its own queue object and no in-memory state
+    other_worker = InProcessQueue(app, is_async=False)
+    job = other_worker.fetch(job_id)
+    assert job["status"] == "finished"
+    assert job["result"]["new_items"] == 3
+
+
+def test_redis_queue_with_fake_redis(app, user, fake_redis):
+    pytest.importorskip("rq")
+    assert isinstance(get_sync_queue(), RedisQueue)
+
+    with patch("webapp.sync.sync_user_items", return_value={"status": "success", "new_items": 1}):
+        job_id = enqueue_sync(user.id)
+
+    job = get_job(job_id)
+    assert job["status"] == "finished"
+    assert job["user_id"] == user.id
+    assert job["result"]["new_items"] == 1
+
+
+def test_api_sync_returns_job_id(auth_client, user):
+    with patch("webapp.sync.sync_user_items", return_value={"status": "success", "new_items": 0}):
+        resp = auth_client.post("/api/sync", data=json.dumps({"full": False}), content_type="application/json")
+
+    assert resp.status_code == 202
+    job_id = resp.get_json()["job_id"]
+
+    resp = auth_client.get(f"/api/sync/jobs/{job_id}")
+    assert resp.status_code == 200
+    assert resp.get_json()["status"] == "finished"
+
+
+def test_api_sync_job_not_found(auth_client):
+    resp = auth_client.get("/api/sync/jobs/missing")
+    assert resp.status_code == 404
+
+
+def test_api_sync_rejects_unknown_mode(auth_client):
+    resp = auth_client.post("/api/sync", data=json.dumps({"mode": "bogus"}), content_type="application/json")
+    assert resp.status_code == 400
+
+
+def test_api_sync_rejects_bad_since_days(auth_client):
+    with patch("webapp.jobs.enqueue_sync") as enqueue:
+        for since_days in ("7", -1, 0, 1.5, True):
+            resp = auth_client.post("/api/sync", json={"mode": "metadata", "since_days": since_days})
+            assert resp.status_code == 400
+        enqueue.assert_not_called()
+
+
+def test_api_sync_force_prune(auth_client, user):
+    with patch("webapp.jobs.enqueue_sync", return_value="job") as enqueue:
+        resp = auth_client.post("/api/sync", json={"force_prune": True})
+        assert resp.status_code == 400
+        resp = auth_client.post("/api/sync", json={"full": True, "force_prune": True})
+        assert resp.status_code == 202
+    enqueue.assert_called_once_with(user.id, True, "saved", None, True)
@@ -1,7 +1,9 @@
 """Tests for database models."""
 
 from datetime import datetime, timedelta
-from webapp.models import User, SavedItem, ApiKey
+import sqlalchemy
+from webapp.app import _backfill_previews
+from webapp.models import PREVIEW_LENGTH, User, SavedItem, ApiKey, make_preview
 
 
 def test_user_creation(app, db):
@@ -50,7 +52,6 @@ def test_saved_item_unique_constraint(app, db, user):
     db.session.add(item1)
     db.session.commit()
 
-    import sqlalchemy
     item2 = SavedItem(
         user_id=user.id, reddit_id="dup1", reddit_fullname="t3_dup1",
         item_type="post", subreddit="test", author="a",
@@ -71,3 +72,41 @@ def test_api_key_creation(app, db, user):
     db.session.commit()
     assert key.is_active is True
     assert key.last_used_at is None
+
+
+def test_make_preview():
+    assert make_preview("post", True, "short text", None, None) == "short text"
+    assert make_preview("post", True, "x" * 500, None, None) == "x" * PREVIEW_LENGTH + "..."
+    assert make_preview("post", False, None, None, "https://example.com") == "https://example.com"
+    assert make_preview("comment", None, None, "A comment", None) == "A comment"
+    assert make_preview("post", True, None, None, None) == ""
+
+
+def test_list_queries_defer_large_text(app, db, saved_item):
+    db.session.expunge_all()
+    item = SavedItem.query.first()
+    assert "selftext" not in item.__dict__
+    assert "notes" not in item.__dict__
+    assert item.selftext is None
+    assert "body" in item.__dict__  # loaded together with its group
+
+
+def test_backfill_previews(app, db, saved_item):
+    saved_item.selftext = "Stored before previews existed"
+    saved_item.is_self = True
+    saved_item.preview = None
+    db.session.commit()
+    _backfill_previews()
+    db.session.refresh(saved_item)
+    assert saved_item.preview == "Stored before previews existed"
+
+
+def test_backfill_previews_command(app, db, saved_item):
+    saved_item.preview = None
+    db.session.commit()
+    result = app.test_cli_runner().invoke(args=["backfill-previews"])
+    assert result.exit_code == 0
+    assert "Backfilled previews for 1 item(s)" in result.output
+    db.session.refresh(saved_item)
+    assert saved_item.preview is not None
+
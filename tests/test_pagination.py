@@ -0,0 +1,58 @@
+"""Tests for keyset pagination."""
+
+from datetime import datetime, timedelta
+from webapp.models import SavedItem
+from webapp.pagination import decode_cursor, encode_cursor, keyset_page
+
+
+def _add_items(make_item, user, count):
+    for i in range(count):
+        # Pairs of items share a timestamp so ties are broken by id
+        make_item(user, f"r{i}", created_utc=datetime(2024, 1, 1) + timedelta(minutes=i // 2),
+                  title=f"Item {i}")
+
+
+def _query(user):
+    return SavedItem.query.filter_by(user_id=user.id)
+
+
+def test_cursor_roundtrip(app, saved_item):
+    assert decode_cursor(encode_cursor(saved_item)) == (saved_item.created_utc, saved_item.id)
+
+
+def test_decode_cursor_rejects_garbage():
+    assert decode_cursor("not-a-cursor") is None
+    assert decode_cursor(None) is None
+
+
+def test_keyset_walks_every_item_once(app, user, make_item):
+    _add_items(make_item, user, 25)
+    expected = [i.id for i in _query(user).order_by(
+        SavedItem.created_utc.desc(), SavedItem.id.desc())]
+
+    seen, cursor = [], None
+    while True:
+        page = keyset_page(_query(user), 10, after=cursor)
+        seen += [i.id for i in page["items"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == expected
+
+
+def test_keyset_prev_cursor_returns_previous_page(app, user, make_item):
+    _add_items(make_item, user, 25)
+    first = keyset_page(_query(user), 10)
+    assert first["prev_cursor"] is None
+    second = keyset_page(_query(user), 10, after=first["next_cursor"])
+    back = keyset_page(_query(user), 10, before=second["prev_cursor"])
+    assert [i.id for i in back["items"]] == [i.id for i in first["items"]]
+    assert back["prev_cursor"] is None
+    assert back["next_cursor"] == first["next_cursor"]
+
+
+def test_index_paginates_with_cursor(auth_client, user, make_item):
+    _add_items(make_item, user, 25)
+    resp = auth_client.get("/")
+    assert b"25 items" in resp.data
+    assert b"?after=" in resp.data
@@ -0,0 +1,188 @@
+"""Tests for the shared token-bucket rate limiter."""
+
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from flask import g
+from webapp.api_auth import generate_api_key
+from webapp.models import ApiKey
+from webapp.ratelimit import (
+    MemoryBucketStore, RateLimitWaitTooLong, RedisBucketStore, TokenBucketLimiter, get_reddit_limiter,
+    make_bucket_store,
+)
+
+
+def test_bucket_allows_burst_then_waits():
+    limiter = TokenBucketLimiter(MemoryBucketStore(), capacity=2, window=2)
+    with patch("webapp.ratelimit.time.time", return_value=100.0):
+        assert limiter.try_acquire("k")[0] == 0
+        assert limiter.try_acquire("k")[0] == 0
+        wait, _ = limiter.try_acquire("k")
+    assert wait == pytest.approx(1.0)
+
+
+def test_bucket_refills_over_time():
+    limiter = TokenBucketLimiter(MemoryBucketStore(), capacity=1, window=10)
+    with patch("webapp.ratelimit.time.time", return_value=100.0):
+        limiter.try_acquire("k")
+    with patch("webapp.ratelimit.time.time", return_value=110.0):
+        assert limiter.try_acquire("k")[0] == 0
+
+
+def test_keys_are_independent():
+    limiter = TokenBucketLimiter(MemoryBucketStore(), capacity=1, window=60)
+    limiter.try_acquire("a")
+    assert limiter.try_acquire("b")[0] == 0
+
+
+def test_observe_exhausted_waits_for_reset():
+    limiter = TokenBucketLimiter(MemoryBucketStore(), capacity=100, window=60)
+    with patch("webapp.ratelimit.time.time", return_value=100.0):
+        limiter.observe("k", {"x-ratelimit-remaining": "0", "x-ratelimit-reset": "12"})
+        wait, _ = limiter.try_acquire("k")
+    assert wait == pytest.approx(12.0)
+
+
+def test_observe_caps_tokens_to_remaining():
+    limiter = TokenBucketLimiter(MemoryBucketStore(), capacity=100, window=60)
+    with patch("webapp.ratelimit.time.time", return_value=100.0):
+        limiter.observe("k", {"x-ratelimit-remaining": "1.0", "x-ratelimit-reset": "30"})
+        assert limiter.try_acquire("k")[0] == 0
+        assert limiter.try_acquire("k")[0] > 0
+
+
+def test_observe_ignores_missing_headers():
+    limiter = TokenBucketLimiter(MemoryBucketStore(), capacity=1, window=60)
+    limiter.observe("k", {})
+    assert limiter.try_acquire("k")[0] == 0
+
+
+def test_acquire_sleeps_until_granted():
+    limiter = TokenBucketLimiter(MemoryBucketStore(), capacity=1, window=1)
+    slept = []
+    limiter.acquire("k")
+    with patch("webapp.ratelimit.time.time", side_effect=[1000.0, 1001.0]):
+        limiter.store._buckets["k"] = (0.0, 1000.0)
+        waited = limiter.acquire("k", sleep=slept.append)
+    assert slept == [pytest.approx(1.0)]
+    assert waited == pytest.approx(1.0)
+
+
+def test_reddit_limiter_uses_memory_without_redis(app):
+    assert isinstance(get_reddit_limiter().store, MemoryBucketStore)
+
+
+def test_redis_bucket_store(app, fake_redis):
+    pytest.importorskip("lupa")
+    limiter = get_reddit_limiter()
+    assert isinstance(limiter.store, RedisBucketStore)
+    limiter = TokenBucketLimiter(limiter.store, capacity=1, window=10)
+    with patch("webapp.ratelimit.time.time", return_value=100.0):
+        assert limiter.try_acquire("shared")[0] == 0
+        assert limiter.try_acquire("shared")[0] == pytest.approx(10.0)
+        limiter.observe("shared", {"x-ratelimit-remaining": "0", "x-ratelimit-reset": "30"})
+        assert limiter.try_acquire("shared")[0] == pytest.approx(30.0)
+
+
+def _key_headers(raw_key):
+    return {"X-API-Key": raw_key}
+
+
+def test_api_key_gets_429_when_budget_is_spent(app, client, api_key):
+    raw_key, _ = api_key
+    app.config["API_RATE_LIMIT_READ"] = 2
+
+    first = client.get("/api/stats", headers=_key_headers(raw_key))
+    assert first.status_code == 200
+    assert first.headers["RateLimit-Limit"] == "2"
+    assert first.headers["RateLimit-Remaining"] == "1"
+    assert first.headers["RateLimit-Policy"] == "2;w=60"
+
+    client.get("/api/stats", headers=_key_headers(raw_key))
+    denied = client.get("/api/stats", headers=_key_headers(raw_key))
+    assert denied.status_code == 429
+    assert denied.json["error"] == "Rate limit exceeded"
+    assert denied.headers["RateLimit-Remaining"] == "0"
+    assert int(denied.headers["Retry-After"]) >= 1
+
+    # Other route classes have their own budget
+    assert client.post("/api/item/missing/state", json={}, headers=_key_headers(raw_key)).status_code != 429
+
+
+def test_user_budget_is_shared_across_keys(app, client, db, user, api_key):
+    app.config["API_RATE_LIMIT_SYNC"] = 1
+    app.config["API_USER_RATE_LIMIT_FACTOR"] = 1
+    second_raw, second_hash = generate_api_key()
+    db.session.add(ApiKey(user_id=user.id, key_hash=second_hash, name="second"))
+    db.session.commit()
+
+    user.sync_in_progress = True
+    user.sync_lease_expires_at = datetime.utcnow() + timedelta(minutes=5)
+    db.session.commit()
+
+    assert client.post("/api/sync", headers=_key_headers(api_key[0])).status_code == 409
+    assert client.post("/api/sync", headers=_key_headers(second_raw)).status_code == 429
+
+
+def test_api_usage_counters_on_keys_page(app, auth_client, api_key):
+    raw_key, key = api_key
+    app.config["API_RATE_LIMIT_READ"] = 1
+    script = app.test_client()
+    script.get("/api/stats", headers=_key_headers(raw_key))
+    script.get("/api/stats", headers=_key_headers(raw_key))
+    g.pop("_login_user", None)
+
+    keys = auth_client.get("/api/keys").json
+    assert keys[0]["usage_today"] == {"read": 2, "mutate": 0, "sync": 0, "limited": 1}
+
+    page = auth_client.get("/settings/api-keys").get_data(as_text=True)
+    assert "Today: 2 requests" in page
+    assert "1 rate limited" in page
+
+
+def test_memory_store_usage_counters_expire(app):
+    store = MemoryBucketStore()
+    with patch("webapp.ratelimit.time.time", return_value=100.0):
+        store.count("old", "read", ttl=60)
+        store.count("usage", "read", ttl=60)
+    with patch("webapp.ratelimit.time.time", return_value=150.0):
+        store.count("usage", "read", ttl=60)
+        assert store.counts("usage") == {"read": 2}
+    with patch("webapp.ratelimit.time.time", return_value=200.0):
+        assert store.counts("old") == {}
+        store.count("usage", "limited", ttl=60)
+    assert "old" not in store._counters
+    with patch("webapp.ratelimit.time.time", return_value=261.0):
+        assert store.counts("usage") == {}
+
+
+def test_keys_page_notes_per_worker_usage(auth_client, api_key):
+    page = auth_client.get("/settings/api-keys").get_data(as_text=True)
+    assert "kept per worker process" in page
+
+
+def test_redis_store_counts_usage(app, fake_redis):
+    store = make_bucket_store(app)
+    store.count("usage", "read", ttl=60)
+    store.count("usage", "read", ttl=60)
+    store.count("usage", "limited", ttl=60)
+    assert store.counts("usage") == {"read": 2, "limited": 1}
+    assert 0 < fake_redis.ttl(RedisBucketStore.PREFIX + "usage") <= 60
+
+
+def test_acquire_fails_fast_past_max_wait():
+    limiter = TokenBucketLimiter(MemoryBucketStore(), capacity=10, window=60)
+    slept = []
+    with patch("webapp.ratelimit.time.time", return_value=100.0):
+        limiter.observe("k", {"x-ratelimit-remaining": "0", "x-ratelimit-reset": "600"})
+        with pytest.raises(RateLimitWaitTooLong) as exc:
+            limiter.acquire("k", sleep=slept.append, max_wait=5)
+    assert exc.value.wait == pytest.approx(600)
+    assert slept == []
+
+
+def test_defer_delays_next_token():
+    limiter = TokenBucketLimiter(MemoryBucketStore(), capacity=10, window=10)
+    with patch("webapp.ratelimit.time.time", return_value=100.0):
+        limiter.defer("k", 7)
+        assert limiter.try_acquire("k")[0] == pytest.approx(7)
@@ -0,0 +1,60 @@
+"""Tests for the multi-user sync scheduler."""
+
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from webapp.models import User
+from webapp.scheduler import stale_user_ids, sync_all_users
+
+
+def _make_user(db, name, last_sync_at=None, refresh_token="rt"):
+    u = User(reddit_id=name, username=name, refresh_token=refresh_token, last_sync_at=last_sync_at)
+    db.session.add(u)
+    db.session.commit()
+    return u.id
+
+
+def test_stale_user_ids_orders_by_staleness(app, db):
+    now = datetime.utcnow()
+    recent = _make_user(db, "recent", now - timedelta(minutes=5))
+    never = _make_user(db, "never")
+    old = _make_user(db, "old", now - timedelta(days=1))
+    _make_user(db, "no-token", refresh_token=None)
+
+    assert stale_user_ids() == [never, old, recent]
+    assert stale_user_ids(timedelta(hours=1)) == [never, old]
+
+
+def test_sync_all_users_runs_each_user(app, db):
+    first = _make_user(db, "a")
+    second = _make_user(db, "b", datetime.utcnow())
+
+    with patch("webapp.scheduler.sync_user_items", return_value={"status": "success"}) as sync:
+        results = sync_all_users(app, max_workers=1, full_sync=True)
+
+    assert list(results) == [first, second]
+    assert [c.args for c in sync.call_args_list] == [(first, True, "saved"), (second, True, "saved")]
+    assert all(c.kwargs == {"force_prune": False} for c in sync.call_args_list)
+
+
+def test_sync_all_command(app, db):
+    _make_user(db, "a")
+    result_ok = {"status": "success", "new_items": 3, "updated_items": 0}
+    with patch("webapp.scheduler.sync_user_items", return_value=result_ok):
+        result = app.test_cli_runner().invoke(args=["sync-all", "--workers", "1"])
+
+    assert result.exit_code == 0
+    assert "3 new" in result.output
+    assert "Synced 1/1 users" in result.output
+
+
+
+def test_sync_all_command_force_prune(app, db):
+    user_id = _make_user(db, "a")
+    result_ok = {"status": "success", "new_items": 0, "updated_items": 0}
+    runner = app.test_cli_runner()
+    with patch("webapp.scheduler.sync_user_items", return_value=result_ok) as sync:
+        assert runner.invoke(args=["sync-all", "--force-prune"]).exit_code == 2
+        result = runner.invoke(args=["sync-all", "--full", "--force-prune", "--workers", "1"])
+
+    assert result.exit_code == 0
+    sync.assert_called_once_with(user_id, True, "saved", force_prune=True)
@@ -1,7 +1,21 @@
 """Tests for sync service."""
 
+import threading
+import time
+from datetime import datetime, timedelta
 from unittest.mock import patch, MagicMock
-from webapp.sync import RedditSyncService, RedditAPIError, sync_user_items, unsave_user_item
+
+import pytest
+from webapp.app import create_app
+from webapp.extensions import db as _db
+from webapp.facets import get_facets
+from webapp.models import SavedItem, User
+from webapp.sync import (
+    RedditSyncService, RedditAPIError, claim_sync, recategorize_items, recover_stale_syncs, release_sync,
+    sync_user_items, unsave_user_item,
+)
+
+from .conftest import TestConfig
 
 
 def test_reddit_api_error():
@@ -16,12 +30,17 @@ def test_sync_service_init(app, user):
     assert "Bearer" in service.headers["Authorization"]
 
 
-def test_check_rate_limit(app, user):
-    service = RedditSyncService(user, {})
-    response = MagicMock()
-    response.headers = {"x-ratelimit-remaining": "50", "x-ratelimit-reset": "10"}
-    service._check_rate_limit(response)
-    assert service.rate_limit_remaining == 50
+def test_make_request_feeds_rate_limit_headers(app, user):
+    service = RedditSyncService(user, {"REDDIT_CLIENT_ID": "client"})
+    response = MagicMock(status_code=200, text="{}")
+    response.json.return_value = {}
+    response.headers = {"x-ratelimit-remaining": "0", "x-ratelimit-reset": "10"}
+    with patch.object(service.transport, "session") as session:
+        session.request.return_value = response
+        service._make_request("/api/v1/me")
+
+    wait, _ = service.limiter.try_acquire("reddit:client")
+    assert 9 < wait <= 10
 
 
 def test_sync_user_items_user_not_found(app):
@@ -31,6 +50,7 @@ def test_sync_user_items_user_not_found(app):
 
 def test_sync_user_items_already_running(app, db, user):
     user.sync_in_progress = True
+    user.sync_lease_expires_at = datetime.utcnow() + timedelta(minutes=5)
     db.session.commit()
     result = sync_user_items(user.id)
     assert result["error"] == "Sync already in progress"
@@ -44,3 +64,405 @@ def test_unsave_user_item_user_not_found(app):
 def test_unsave_user_item_item_not_found(app, user):
     result = unsave_user_item(user.id, "nonexistent")
     assert result["error"] == "Item not found"
+
+
+def _listing(children, after=None):
+    return {"data": {"children": children, "after": after}}
+
+
+def _post(reddit_id, score=1, subreddit="homelab"):
+    return {"kind": "t3", "data": {
+        "id": reddit_id, "name": f"t3_{reddit_id}", "subreddit": subreddit,
+        "author": "someone", "permalink": f"/r/{subreddit}/comments/{reddit_id}/",
+        "score": score, "created_utc": 1700000000, "title": f"Post {reddit_id}",
+        "url": "https://example.com", "selftext": "", "is_self": False, "num_comments": 3,
+    }}
+
+
+def _comment(reddit_id, score=1):
+    return {"kind": "t1", "data": {
+        "id": reddit_id, "name": f"t1_{reddit_id}", "subreddit": "ClaudeAI",
+        "author": "someone", "permalink": f"/r/ClaudeAI/comments/x/y/{reddit_id}/",
+        "score": score, "created_utc": 1700000000, "body": "A comment",
+        "link_title": "Parent post",
+    }}
+
+
+def test_sync_saved_items_bulk_insert(app, db, user):
+    service = RedditSyncService(user, {})
+    pages = [_listing([_post("p1"), _comment("c1")], after="t1_c1"), _listing([_post("p2")])]
+    with patch.object(service, "_make_request", side_effect=pages):
+        result = service.sync_saved_items(full_sync=True)
+
+    assert (result["new_items"], result["updated_items"]) == (3, 0)
+    assert result["pages_fetched"] == 2
+    assert SavedItem.query.filter_by(user_id=user.id).count() == 3
+    comment = SavedItem.query.filter_by(reddit_id="c1").one()
+    assert comment.item_type == "comment"
+    assert comment.category == "AI & LLMs"
+    assert comment.post_title == "Parent post"
+
+
+def test_sync_saved_items_full_sync_updates_without_clobbering_state(app, db, user, saved_item):
+    saved_item.reviewed = True
+    saved_item.notes = "keep me"
+    db.session.commit()
+
+    service = RedditSyncService(user, {})
+    page = _listing([_post(saved_item.reddit_id, score=99), _post("new1")])
+    with patch.object(service, "_make_request", return_value=page):
+        result = service.sync_saved_items(full_sync=True)
+
+    assert (result["new_items"], result["updated_items"]) == (1, 1)
+    db.session.refresh(saved_item)
+    assert saved_item.score == 99
+    assert saved_item.num_comments == 3
+    assert saved_item.reviewed is True
+    assert saved_item.notes == "keep me"
+
+
+def test_sync_saved_items_incremental_skips_known(app, db, user, saved_item):
+    service = RedditSyncService(user, {})
+    page = _listing([_post(saved_item.reddit_id, score=99), _post("new1")])
+    with patch.object(service, "_make_request", return_value=page):
+        result = service.sync_saved_items(full_sync=False)
+
+    assert (result["new_items"], result["updated_items"]) == (1, 0)
+    db.session.refresh(saved_item)
+    assert saved_item.score == 42
+
+
+def test_sync_saved_items_records_high_water_mark(app, db, user):
+    service = RedditSyncService(user, {})
+    with patch.object(service, "_make_request", return_value=_listing([_post("p2"), _post("p1")])):
+        service.sync_saved_items()
+    assert user.sync_high_water_mark == "t3_p2"
+
+
+def test_incremental_sync_stops_at_high_water_mark(app, db, user):
+    user.sync_high_water_mark = "t3_p1"
+    db.session.commit()
+    service = RedditSyncService(user, {})
+    pages = [
+        _listing([_post("p3"), _post("p1")], after="t3_p1"),
+        _listing([_post("p0")]),
+    ]
+    with patch.object(service, "_make_request", side_effect=pages) as request:
+        result = service.sync_saved_items(full_sync=False)
+
+    assert request.call_count == 1
+    assert result["pages_fetched"] == 1
+    assert result["new_items"] == 2
+    assert user.sync_high_water_mark == "t3_p3"
+
+
+def test_incremental_sync_stops_after_known_run(app, db, user):
+    service = RedditSyncService(user, {"SYNC_KNOWN_RUN_LIMIT": 2})
+    with patch.object(service, "_make_request", return_value=_listing([_post("k1"), _post("k2")])):
+        service.sync_saved_items(full_sync=True)
+
+    user.sync_high_water_mark = "t3_unsaved"
+    pages = [
+        _listing([_post("n1"), _post("k1"), _post("k2")], after="t3_k2"),
+        _listing([_post("old")]),
+    ]
+    with patch.object(service, "_make_request", side_effect=pages) as request:
+        result = service.sync_saved_items(full_sync=False)
+
+    assert request.call_count == 1
+    assert result["new_items"] == 1
+
+
+def test_pipelined_sync_matches_sequential(app, db, user):
+    service = RedditSyncService(user, {"SYNC_PREFETCH_PAGES": 1})
+    pages = [
+        _listing([_post("a1"), _post("a2")], after="t3_a2"),
+        _listing([_post("b1")], after="t3_b1"),
+        _listing([_comment("c1")]),
+    ]
+    with patch.object(service, "_make_request", side_effect=pages):
+        result = service.sync_saved_items(full_sync=True, pipelined=True)
+
+    assert result == {"new_items": 4, "updated_items": 0, "pruned_items": 0, "pages_fetched": 3}
+    assert SavedItem.query.filter_by(user_id=user.id).count() == 4
+
+
+def test_pipelined_sync_propagates_fetch_errors(app, db, user):
+    service = RedditSyncService(user, {})
+    pages = [_listing([_post("a1")], after="t3_a1"), RedditAPIError("API error: 500")]
+    with patch.object(service, "_make_request", side_effect=pages), pytest.raises(RedditAPIError):
+        service.sync_saved_items(full_sync=True, pipelined=True)
+
+    assert SavedItem.query.filter_by(reddit_id="a1").count() == 1
+
+
+def test_pipelined_sync_stops_producer_on_early_exit(app, db, user):
+    user.sync_high_water_mark = "t3_a1"
+    db.session.commit()
+    service = RedditSyncService(user, {"SYNC_PREFETCH_PAGES": 1})
+    endless = (_listing([_post(f"p{n}"), _post("a1")], after=f"t3_p{n}") for n in range(1000))
+    with patch.object(service, "_make_request", side_effect=endless):
+        result = service.sync_saved_items(full_sync=False, pipelined=True)
+
+    assert result["new_items"] == 2
+    # At most the consumed page plus the bounded prefetch
+    assert result["pages_fetched"] <= 3
+
+
+def test_pipelined_sync_does_not_wait_for_a_blocked_producer(app, db, user):
+    service = RedditSyncService(user, {})
+    service.PREFETCH_JOIN_TIMEOUT = 0.1
+    release = threading.Event()
+
+    pages = iter([_listing([_post("a1")], after="t3_a1")])
+
+    def request(*args, **kwargs):
+        # Second page: stuck as if waiting on a rate-limit token
+        page = next(pages, None)
+        if page is None:
+            release.wait(5)
+            return _listing([])
+        return page
+
+    with patch.object(service, "_make_request", side_effect=request), \
+            patch.object(service, "_save_page", side_effect=RuntimeError("db down")):
+        started = time.monotonic()
+        with pytest.raises(RuntimeError):
+            service.sync_saved_items(full_sync=True, pipelined=True)
+    release.set()
+
+    assert time.monotonic() - started < 2
+
+
+def test_claim_sync_is_conditional(app, db, user):
+    assert claim_sync(user.id) is True
+    assert claim_sync(user.id) is False
+    release_sync(user.id)
+    assert claim_sync(user.id) is True
+
+
+def test_claim_sync_sets_lease(app, db, user):
+    assert claim_sync(user.id) is True
+    db.session.refresh(user)
+    assert user.sync_lease_expires_at > datetime.utcnow()
+    assert user.is_sync_running() is True
+
+
+def test_claim_sync_takes_over_expired_lease(app, db, user):
+    user.sync_in_progress = True
+    user.sync_lease_expires_at = datetime.utcnow() - timedelta(seconds=1)
+    db.session.commit()
+    assert user.is_sync_running() is False
+    assert claim_sync(user.id) is True
+
+
+def test_recover_stale_syncs(app, db, user):
+    user.sync_in_progress = True
+    user.sync_lease_expires_at = datetime.utcnow() - timedelta(minutes=1)
+    db.session.commit()
+
+    assert recover_stale_syncs() == 1
+    db.session.refresh(user)
+    assert user.sync_in_progress is False
+    assert user.sync_lease_expires_at is None
+
+
+def test_recover_stale_syncs_keeps_live_claims(app, db, user):
+    claim_sync(user.id)
+    assert recover_stale_syncs() == 0
+
+
+def test_sync_page_renews_lease(app, db, user):
+    claim_sync(user.id)
+    user.sync_lease_expires_at = datetime.utcnow() + timedelta(seconds=1)
+    db.session.commit()
+
+    service = RedditSyncService(user, {})
+    service._save_page([_post("p1")], full_sync=True)
+    db.session.refresh(user)
+    assert user.sync_lease_expires_at > datetime.utcnow() + timedelta(minutes=1)
+
+
+def test_claim_sync_race(tmp_path):
+
+    class FileDbConfig(TestConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'race.db'}"
+
+    app = create_app(FileDbConfig)
+    with app.app_context():
+        u = User(reddit_id="racer", username="racer")
+        _db.session.add(u)
+        _db.session.commit()
+        user_id = u.id
+
+    start = threading.Barrier(8)
+    results = []
+
+    def contend():
+        with app.app_context():
+            start.wait()
+            results.append(claim_sync(user_id))
+            _db.session.remove()
+
+    threads = [threading.Thread(target=contend) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results.count(True) == 1
+    assert len(results) == 8
+
+
+def test_full_sync_prunes_unsaved_items(app, db, user, saved_item):
+    unsaved_id = saved_item.reddit_id
+    service = RedditSyncService(user, {})
+    still_saved = [_post(f"still-saved-{i}") for i in range(10)]
+    with patch.object(service, "_make_request", return_value=_listing(still_saved)):
+        result = service.sync_saved_items(full_sync=True)
+
+    assert result["pruned_items"] == 1
+    assert SavedItem.query.filter_by(reddit_id=unsaved_id).count() == 0
+    assert SavedItem.query.filter_by(reddit_id="still-saved-0").count() == 1
+
+
+def test_full_sync_empty_listing_keeps_items(app, db, user, saved_item):
+    for response in ({}, _listing([])):
+        service = RedditSyncService(user, {})
+        with patch.object(service, "_make_request", return_value=response):
+            result = service.sync_saved_items(full_sync=True)
+        assert result["pruned_items"] == 0
+        assert SavedItem.query.filter_by(reddit_id=saved_item.reddit_id).count() == 1
+
+
+def test_prune_refuses_to_remove_most_items(app, db, user, saved_item):
+    service = RedditSyncService(user, {})
+    with patch.object(service, "_make_request", return_value=_listing([_post("only-one")])):
+        result = service.sync_saved_items(full_sync=True)
+    assert result["pruned_items"] == 0
+    assert SavedItem.query.filter_by(reddit_id=saved_item.reddit_id).count() == 1
+
+
+def test_force_prune_lifts_the_fraction_cap(app, db, user, saved_item):
+    unsaved_id = saved_item.reddit_id
+    service = RedditSyncService(user, {})
+    with patch.object(service, "_make_request", return_value=_listing([_post("only-one")])):
+        result = service.sync_saved_items(full_sync=True, force_prune=True)
+    assert result["pruned_items"] == 1
+    assert SavedItem.query.filter_by(reddit_id=unsaved_id).count() == 0
+
+
+def test_force_prune_still_needs_a_complete_crawl(app, db, user, saved_item):
+    service = RedditSyncService(user, {})
+    with patch.object(service, "_make_request", return_value=_listing([])):
+        result = service.sync_saved_items(full_sync=True, force_prune=True)
+    assert result["pruned_items"] == 0
+
+
+def test_incremental_sync_never_prunes(app, db, user, saved_item):
+    service = RedditSyncService(user, {})
+    with patch.object(service, "_make_request", return_value=_listing([_post("new1")])):
+        result = service.sync_saved_items(full_sync=False)
+
+    assert result["pruned_items"] == 0
+    assert SavedItem.query.filter_by(reddit_id=saved_item.reddit_id).count() == 1
+
+
+def test_prune_skipped_when_listing_truncated(app, db, user, saved_item):
+    service = RedditSyncService(user, {})
+    service.LISTING_LIMIT = 1
+    with patch.object(service, "_make_request", return_value=_listing([_post("only")])):
+        result = service.sync_saved_items(full_sync=True)
+    assert result["pruned_items"] == 0
+
+
+def test_prune_failed_crawl_keeps_items(app, db, user, saved_item):
+    service = RedditSyncService(user, {})
+    pages = [_listing([_post("p1")], after="t3_p1"), RedditAPIError("API error: 500")]
+    with patch.object(service, "_make_request", side_effect=pages), pytest.raises(RedditAPIError):
+        service.sync_saved_items(full_sync=True)
+    assert SavedItem.query.filter_by(reddit_id=saved_item.reddit_id).count() == 1
+
+
+def _info_response(endpoint, params):
+    assert endpoint == "/api/info"
+    children = []
+    for fullname in params["id"].split(","):
+        kind, reddit_id = fullname.split("_", 1)
+        child = _post(reddit_id, score=500) if kind == "t3" else _comment(reddit_id, score=500)
+        child["data"]["num_comments"] = 77 if kind == "t3" else None
+        children.append(child)
+    return _listing(children)
+
+
+def test_refresh_metadata_batches_info_lookups(app, db, user):
+    service = RedditSyncService(user, {})
+    with patch.object(service, "_make_request", return_value=_listing([_post("a"), _post("b"), _comment("c")])):
+        service.sync_saved_items(full_sync=True)
+
+    service.INFO_BATCH_SIZE = 2
+    with patch.object(service, "_make_request", side_effect=_info_response) as request:
+        result = service.refresh_metadata()
+
+    assert result == {"refreshed_items": 3, "requests": 2}
+    assert request.call_count == 2
+    assert {i.score for i in SavedItem.query.filter_by(user_id=user.id)} == {500}
+    assert SavedItem.query.filter_by(reddit_id="a").one().num_comments == 77
+
+
+def test_refresh_metadata_since_limits_items(app, db, user, saved_item):
+    service = RedditSyncService(user, {})
+    with patch.object(service, "_make_request", side_effect=_info_response) as request:
+        result = service.refresh_metadata(since=datetime.utcnow() + timedelta(days=1))
+
+    assert result == {"refreshed_items": 0, "requests": 0}
+    request.assert_not_called()
+
+
+def test_sync_user_items_metadata_mode_releases_claim(app, db, user, saved_item):
+    with patch.object(RedditSyncService, "_make_request", side_effect=_info_response):
+        result = sync_user_items(user.id, mode="metadata")
+
+    assert result["status"] == "success"
+    assert result["refreshed_items"] == 1
+    db.session.refresh(user)
+    assert user.sync_in_progress is False
+
+
+def test_item_to_row_builds_preview(app, user):
+    service = RedditSyncService(user, {})
+    post = _post("p1")["data"]
+    assert service._item_to_row(post, "t3")["preview"] == "https://example.com"
+    assert service._item_to_row(_comment("c1")["data"], "t1")["preview"] == "A comment"
+
+
+def test_sync_categorizes_subreddits_case_insensitively(app, db, user):
+    service = RedditSyncService(user, {})
+    with patch.object(service, "_make_request", return_value=_listing([_post("p1", subreddit="HomeLab")])):
+        service.sync_saved_items(full_sync=True)
+    assert SavedItem.query.filter_by(reddit_id="p1").one().category == "Self-Hosting & Homelab"
+
+
+def test_recategorize_items_updates_changed_rows(app, db, user, saved_item):
+    stale = SavedItem(
+        user_id=user.id, reddit_id="old1", reddit_fullname="t3_old1", item_type="post",
+        subreddit="HomeLab", permalink="https://reddit.com/r/HomeLab/comments/old1",
+        created_utc=datetime.utcnow(), category="Uncategorized",
+    )
+    db.session.add(stale)
+    db.session.commit()
+    assert get_facets(user.id)["category"]["Uncategorized"] == 1
+
+    assert recategorize_items(user.id) == {"updated_items": 1, "users": 1}
+    assert db.session.get(SavedItem, stale.id).category == "Self-Hosting & Homelab"
+    facets = get_facets(user.id)
+    assert facets["category"] == {"Self-Hosting & Homelab": 2}
+    db.session.refresh(user)
+    assert user.data_version == 1
+    assert recategorize_items(user.id) == {"updated_items": 0, "users": 0}
+
+
+def test_recategorize_command(app, saved_item):
+    result = app.test_cli_runner().invoke(args=["recategorize"])
+    assert result.exit_code == 0
+    assert "Recategorized 0 item(s) for 0 user(s)" in result.output
@@ -0,0 +1,131 @@
+"""Tests for the shared Reddit HTTP transport."""
+
+import pytest
+import requests
+from unittest.mock import MagicMock, patch
+from webapp.ratelimit import MemoryBucketStore, TokenBucketLimiter
+from webapp.transport import RedditTransport, get_transport
+
+
+def _response(status, headers=None):
+    response = MagicMock()
+    response.status_code = status
+    response.headers = headers or {}
+    return response
+
+
+@pytest.fixture
+def transport():
+    t = RedditTransport(max_retries=2, backoff_base=1, backoff_cap=4, max_wait=30)
+    t.session = MagicMock()
+    return t
+
+
+def test_get_transport_is_shared():
+    config = {"REDDIT_HTTP_MAX_RETRIES": 5}
+    assert get_transport(config) is get_transport(dict(config))
+    assert get_transport(config).max_retries == 5
+
+
+def test_request_passes_default_timeout(transport):
+    transport.session.request.return_value = _response(200)
+    transport.request("GET", "https://example.com")
+    assert transport.session.request.call_args.kwargs["timeout"] == (5, 30)
+
+
+def test_retry_after_honoured(transport):
+    transport.session.request.side_effect = [_response(429, {"Retry-After": "7"}), _response(200)]
+    with patch("webapp.transport.time.sleep") as sleep:
+        response = transport.request("GET", "https://example.com")
+
+    assert response.status_code == 200
+    sleep.assert_called_once_with(7.0)
+    assert transport.snapshot() == {"requests": 2, "retries": 1, "sleep_seconds": 7.0}
+
+
+def test_ratelimit_reset_used_for_429(transport):
+    transport.session.request.side_effect = [_response(429, {"x-ratelimit-reset": "3"}), _response(200)]
+    with patch("webapp.transport.time.sleep") as sleep:
+        transport.request("GET", "https://example.com")
+    sleep.assert_called_once_with(3.0)
+
+
+def test_server_error_backs_off_with_jitter(transport):
+    transport.session.request.side_effect = [_response(503), _response(503), _response(200)]
+    with patch("webapp.transport.time.sleep") as sleep:
+        response = transport.request("GET", "https://example.com")
+
+    assert response.status_code == 200
+    first, second = (c.args[0] for c in sleep.call_args_list)
+    assert 0.5 <= first <= 1
+    assert 1 <= second <= 2
+
+
+def test_retries_bounded(transport):
+    transport.session.request.return_value = _response(503)
+    with patch("webapp.transport.time.sleep"):
+        response = transport.request("GET", "https://example.com")
+
+    assert response.status_code == 503
+    assert transport.session.request.call_count == 3
+
+
+def test_wait_longer_than_max_wait_returns_response(transport):
+    transport.session.request.return_value = _response(429, {"Retry-After": "300"})
+    with patch("webapp.transport.time.sleep") as sleep:
+        response = transport.request("GET", "https://example.com")
+
+    assert response.status_code == 429
+    sleep.assert_not_called()
+
+
+def test_connection_error_reraised_after_retries(transport):
+    transport.session.request.side_effect = requests.ConnectionError("down")
+    with patch("webapp.transport.time.sleep"), pytest.raises(requests.ConnectionError):
+        transport.request("GET", "https://example.com")
+    assert transport.snapshot()["retries"] == 2
+
+
+def test_post_is_not_retried_by_default(transport):
+    transport.session.request.return_value = _response(503)
+    with patch("webapp.transport.time.sleep") as sleep:
+        response = transport.request("POST", "https://example.com")
+    assert response.status_code == 503
+    assert transport.session.request.call_count == 1
+    sleep.assert_not_called()
+
+    transport.session.request.side_effect = requests.ConnectionError("down")
+    with pytest.raises(requests.ConnectionError):
+        transport.request("POST", "https://example.com")
+    assert transport.session.request.call_count == 2
+
+
+def test_post_retried_when_caller_opts_in(transport):
+    transport.session.request.side_effect = [_response(503), _response(200)]
+    with patch("webapp.transport.time.sleep"):
+        response = transport.request("POST", "https://example.com", idempotent=True)
+    assert response.status_code == 200
+
+
+def test_since_reports_counters_after_a_snapshot(transport):
+    transport.session.request.return_value = _response(200)
+    transport.request("GET", "https://example.com")
+    before = transport.snapshot()
+    transport.request("GET", "https://example.com")
+    assert transport.since(before) == {"requests": 1, "retries": 0, "sleep_seconds": 0.0}
+
+
+def test_429_waits_once_through_the_limiter(transport):
+    limiter = TokenBucketLimiter(MemoryBucketStore(), capacity=100, window=60)
+    transport.session.request.side_effect = [_response(429, {"Retry-After": "7"}), _response(200)]
+    clock = [100.0]
+
+    def advance(seconds):
+        clock[0] += seconds
+
+    with patch("webapp.transport.time.sleep", side_effect=advance) as sleep, \
+            patch("webapp.ratelimit.time.time", side_effect=lambda: clock[0]):
+        response = transport.request("GET", "https://example.com", limiter=limiter, limit_key="k")
+
+    assert response.status_code == 200
+    sleep.assert_called_once_with(pytest.approx(7.0))
@@ -1,5 +1,8 @@
 """Tests for web view routes."""
 
+from datetime import datetime, timedelta
+from webapp.views import CATEGORY_PER_PAGE
+
 
 def test_index_unauthenticated(client):
     resp = client.get("/")
@@ -35,3 +38,38 @@ def test_search_empty_query(auth_client):
 def test_search_with_query(auth_client, saved_item):
     resp = auth_client.get("/search?q=Test")
     assert resp.status_code == 200
+
+
+def _add_category_items(make_item, user, count):
+    """Self-Hosting & Homelab items c0.. an hour apart across two subreddits."""
+    for i in range(count):
+        make_item(user, f"c{i}", subreddit="selfhosted" if i % 2 else "homelab",
+                  created_utc=datetime(2024, 1, 1) + timedelta(hours=i), title=f"Category item {i}")
+
+
+def test_category_first_page_is_bounded(auth_client, user, make_item):
+    _add_category_items(make_item, user, CATEGORY_PER_PAGE + 5)
+    resp = auth_client.get("/category/Self-Hosting%20%26%20Homelab")
+    assert resp.data.count(b"class=\"item-card") == CATEGORY_PER_PAGE
+    assert f"of {CATEGORY_PER_PAGE + 5} items".encode() in resp.data
+    assert b"r/selfhosted" in resp.data
+    assert b"load-more" in resp.data
+
+
+def test_category_items_fragment_pages_to_the_end(auth_client, user, make_item):
+    _add_category_items(make_item, user, CATEGORY_PER_PAGE * 2 + 3)
+    url = "/category/Self-Hosting%20%26%20Homelab/items"
+    counts = []
+    while url:
+        data = auth_client.get(url).get_json()
+        counts.append(data["count"])
+        url = data["next_url"]
+    assert counts == [CATEGORY_PER_PAGE, CATEGORY_PER_PAGE, 3]
+
+
+def test_category_items_fragment_with_search(auth_client, user, make_item):
+    _add_category_items(make_item, user, 3)
+    data = auth_client.get("/category/Self-Hosting%20%26%20Homelab/items?q=item").get_json()
+    assert data["count"] == 3
+    assert data["next_url"] is None
+    assert "<mark>" in data["html"]
@@ -1,5 +1,12 @@
 """Reddit Saved Items Viewer - Flask web application."""
 
-from .app import create_app
-
 __all__ = ["create_app"]
+
+
+def __getattr__(name):
+    # Imported lazily so the standalone scripts can use webapp.categories
+    # without Flask or SQLAlchemy installed
+    if name == "create_app":
+        from .app import create_app
+        return create_app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,17 +1,27 @@
 """API routes for programmatic access to saved items."""
 
-from flask import Blueprint, g, jsonify, request
+from collections import Counter
+from datetime import datetime
+
+from flask import Blueprint, Response, current_app, g, jsonify, request, stream_with_context
 from flask_login import login_required, current_user
-from sqlalchemy import func
+from sqlalchemy import case, func, select, update
+from .cache import bump_data_version, cached_result, conditional, get_result_cache
 from .extensions import db
+from .facets import apply_facet_deltas, facet_count, facet_deltas, get_facets
 from .models import SavedItem, ApiKey
-from .api_auth import api_auth_required, generate_api_key
+from .pagination import decode_cursor, keyset_page
+from .ratelimit import api_rate_limits, api_usage_is_shared, get_api_usage, rate_limited
+from .search import get_search_backend
+from .sync import get_sync_state
+from .api_auth import api_auth_required, generate_api_key, get_key_usage, invalidate_api_key
 
 api_bp = Blueprint("api", __name__)
 
 
 @api_bp.route("/api/item/<item_id>/state", methods=["POST"])
 @api_auth_required
+@rate_limited("mutate")
 def update_item_state(item_id):
     """Update item state (reviewed, notes, etc.)."""
     item = SavedItem.query.filter_by(
@@ -19,6 +29,7 @@ def update_item_state(item_id):
     ).first_or_404()
 
     data = request.json
+    before = facet_deltas([item])
     if "reviewed" in data:
         item.reviewed = data["reviewed"]
     if "notes" in data:
@@ -26,6 +37,10 @@ def update_item_state(item_id):
     if "archived" in data:
         item.archived = data["archived"]
 
+    deltas = facet_deltas([item])
+    deltas.subtract(before)
+    apply_facet_deltas(g.api_user.id, deltas)
+    bump_data_version(g.api_user.id)
     db.session.commit()
 
     return jsonify({
@@ -38,52 +53,335 @@ def update_item_state(item_id):
     })
 
 
+# Columns the items endpoint can return, by field name
+ITEM_FIELDS = {
+    name: getattr(SavedItem, name) for name in (
+        "reddit_id", "reddit_fullname", "item_type", "subreddit", "author", "permalink",
+        "score", "created_utc", "title", "url", "selftext", "is_self", "num_comments",
+        "body", "post_title", "category", "preview", "reviewed", "archived", "notes", "synced_at",
+    )
+}
+# Large text columns are only returned when asked for with fields=
+DEFAULT_ITEM_FIELDS = (
+    "reddit_id", "item_type", "subreddit", "author", "permalink", "score", "created_utc",
+    "title", "post_title", "category", "preview", "reviewed", "archived",
+)
+ITEMS_PER_PAGE = 50
+MAX_ITEMS_PER_PAGE = 200
+
+
+def _parse_bool(value):
+    """Parse a boolean parameter; None if absent, ValueError if invalid."""
+    if value is None or isinstance(value, bool):
+        return value
+    if str(value).lower() in ("1", "true", "yes"):
+        return True
+    if str(value).lower() in ("0", "false", "no"):
+        return False
+    raise ValueError(value)
+
+
+def _filter_items(query, filters):
+    """
+    Apply the item filters shared by the listing and bulk endpoints.
+
+    Args:
+        query: Query over SavedItem columns, already scoped to the user
+        filters: Mapping with any of subreddit, category, type, reviewed,
+            archived, since, until (ISO dates) and q
+
+    Raises:
+        ValueError: If a boolean or date filter is malformed
+    """
+    reviewed = _parse_bool(filters.get("reviewed"))
+    archived = _parse_bool(filters.get("archived"))
+    since = datetime.fromisoformat(filters["since"]) if filters.get("since") else None
+    until = datetime.fromisoformat(filters["until"]) if filters.get("until") else None
+
+    for param, column in (("subreddit", SavedItem.subreddit), ("category", SavedItem.category),
+                          ("type", SavedItem.item_type)):
+        if filters.get(param):
+            query = query.filter(column == filters[param])
+    if reviewed is not None:
+        query = query.filter(SavedItem.reviewed.is_(reviewed))
+    if archived is not None:
+        query = query.filter(SavedItem.archived.is_(archived))
+    if since:
+        query = query.filter(SavedItem.created_utc >= since)
+    if until:
+        query = query.filter(SavedItem.created_utc < until)
+    if filters.get("q"):
+        query = get_search_backend().apply(query, str(filters["q"]).lower(), ranked=False)
+    return query
+
+
+def _serialize_row(row, fields: list[str]) -> dict:
+    """Turn a result row into a JSON dict without building ORM objects."""
+    mapping = row._mapping
+    item = {}
+    for name in fields:
+        value = mapping[name]
+        item[name] = value.isoformat() if hasattr(value, "isoformat") else value
+    return item
+
+
+@api_bp.route("/api/items")
+@api_auth_required
+@rate_limited("read")
+@conditional
+def list_items():
+    """
+    List saved items, newest first, with filters, sparse fields and cursor paging.
+
+    Query parameters: subreddit, category, type, reviewed, archived, since and
+    until (ISO dates on created_utc), q (text search), fields (comma
+    separated), limit (max MAX_ITEMS_PER_PAGE) and cursor (next_cursor of the
+    previous page).
+    """
+    args = request.args
+    fields = [f for f in args.get("fields", ",".join(DEFAULT_ITEM_FIELDS)).split(",") if f]
+    unknown = [f for f in fields if f not in ITEM_FIELDS]
+    if unknown:
+        return jsonify({"error": f"Unknown fields: {', '.join(unknown)}"}), 400
+
+    limit = min(max(args.get("limit", ITEMS_PER_PAGE, type=int), 1), MAX_ITEMS_PER_PAGE)
+    # A bad cursor must not silently restart the listing at the first page
+    if args.get("cursor") and decode_cursor(args["cursor"]) is None:
+        return jsonify({"error": "Invalid cursor"}), 400
+
+    # The keyset needs id and created_utc even when they are not returned
+    columns = [SavedItem.id, SavedItem.created_utc]
+    columns += [ITEM_FIELDS[f].label(f) for f in fields if f != "created_utc"]
+    try:
+        query = _filter_items(db.session.query(*columns).filter(SavedItem.user_id == g.api_user.id), args)
+    except ValueError as e:
+        return jsonify({"error": f"Invalid parameter: {e}"}), 400
+
+    def compute():
+        page = keyset_page(query, limit, after=args.get("cursor"))
+        return {
+            "items": [_serialize_row(row, fields) for row in page["items"]],
+            "next_cursor": page["next_cursor"],
+        }
+
+    params = {**args.to_dict(), "fields": fields, "limit": limit}
+    return jsonify(cached_result(g.api_user.id, "items", params, compute))
+
+
+MAX_BULK_IDS = 1000
+BULK_STATE_FIELDS = ("reviewed", "archived", "notes")
+# Filters understood by _filter_items
+ITEM_FILTERS = ("subreddit", "category", "type", "reviewed", "archived", "since", "until", "q")
+
+
+@api_bp.route("/api/items/state", methods=["POST"])
+@api_auth_required
+@rate_limited("mutate")
+def update_items_state():
+    """
+    Set reviewed/archived/notes on many items in one UPDATE.
+
+    The body names the items either as {"ids": [reddit_id, ...]} (up to
+    MAX_BULK_IDS) or as {"filter": {...}} with the /api/items filters, plus
+    {"set": {"reviewed": true, ...}}. A filter that restricts nothing would
+    touch every item, so it also needs "all": true. Returns the number of
+    items updated and, for an id list, a per-id "updated" or "not_found"
+    result.
+    """
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({"error": "Body must be a JSON object"}), 400
+    values = data.get("set") or {}
+    ids = data.get("ids")
+    filters = data.get("filter")
+
+    if not isinstance(values, dict) or not values or set(values) - set(BULK_STATE_FIELDS):
+        return jsonify({"error": f"set must contain some of: {', '.join(BULK_STATE_FIELDS)}"}), 400
+    if (ids is None) == (filters is None):
+        return jsonify({"error": "Provide exactly one of ids or filter"}), 400
+    if ids is not None and (not isinstance(ids, list) or len(ids) > MAX_BULK_IDS
+                            or not all(isinstance(i, str) for i in ids)):
+        return jsonify({"error": f"ids must be a list of at most {MAX_BULK_IDS} reddit ids"}), 400
+    if filters is not None and not isinstance(filters, dict):
+        return jsonify({"error": "filter must be an object"}), 400
+    for name in ITEM_FILTERS:
+        value = (filters or {}).get(name)
+        allowed = (str, bool) if name in ("reviewed", "archived") else str
+        if value is not None and not isinstance(value, allowed):
+            return jsonify({"error": f"Invalid parameter: {name}"}), 400
+    if (filters is not None and data.get("all") is not True
+            and not any(filters.get(name) not in (None, "") for name in ITEM_FILTERS)):
+        return jsonify({"error": "Empty filter matches every item; pass \"all\": true to confirm"}), 400
+    if "notes" in values and not isinstance(values["notes"], (str, type(None))):
+        return jsonify({"error": "notes must be a string or null"}), 400
+    try:
+        for flag in ("reviewed", "archived"):
+            if flag in values:
+                values[flag] = _parse_bool(values[flag])
+                if values[flag] is None:
+                    raise ValueError(flag)
+        if filters is not None:
+            matched = _filter_items(db.session.query(SavedItem.id).filter(SavedItem.user_id == g.api_user.id), filters)
+        else:
+            matched = db.session.query(SavedItem.id).filter(
+                SavedItem.user_id == g.api_user.id, SavedItem.reddit_id.in_(ids)
+            )
+    except ValueError as e:
+        return jsonify({"error": f"Invalid parameter: {e}"}), 400
+    in_matched = SavedItem.id.in_(select(matched.subquery().c.id))
+    flags = [flag for flag in ("reviewed", "archived") if flag in values]
+
+    # Count flag flips up front so the facet counts move by the same amount
+    flips = [func.count(SavedItem.id)]
+    for flag in flags:
+        column = func.coalesce(getattr(SavedItem, flag), False)
+        flips.append(func.sum(case((column.is_(not values[flag]), 1), else_=0)))
+    counts = db.session.query(*flips).filter(in_matched).one()
+
+    found = None
+    if ids is not None:
+        found = {rid for (rid,) in db.session.query(SavedItem.reddit_id).filter(in_matched)}
+
+    db.session.execute(
+        update(SavedItem).where(in_matched).values(**values).execution_options(synchronize_session=False)
+    )
+
+    deltas = Counter()
+    for flag, flipped in zip(flags, counts[1:]):
+        deltas[(flag, "")] = (flipped or 0) if values[flag] else -(flipped or 0)
+    apply_facet_deltas(g.api_user.id, deltas)
+    if counts[0]:
+        bump_data_version(g.api_user.id)
+    db.session.commit()
+
+    result = {"success": True, "updated": counts[0]}
+    if found is not None:
+        result["results"] = {rid: "updated" if rid in found else "not_found" for rid in ids}
+    return jsonify(result)
+
+
+@api_bp.route("/api/export")
+@api_auth_required
+@rate_limited("read")
+def export_items():
+    """
+    Stream all (or filtered) items as ndjson, json, csv or markdown.
+
+    Takes the /api/items filters plus format and gzip=1. Rows are read
+    through a server-side cursor and written as they are formatted.
+    """
+    from .export import EXPORT_FORMATS, EXPORTERS, coalesce_chunks, gzip_stream
+
+    export_format = request.args.get("format", "ndjson")
+    if export_format not in EXPORTERS:
+        return jsonify({"error": f"format must be one of: {', '.join(EXPORTERS)}"}), 400
+    try:
+        query = _filter_items(SavedItem.query.filter(SavedItem.user_id == g.api_user.id), request.args)
+    except ValueError as e:
+        return jsonify({"error": f"Invalid parameter: {e}"}), 400
+
+    mimetype, extension = EXPORT_FORMATS[export_format]
+    filename = f"reddit-saved.{extension}"
+    body = coalesce_chunks(EXPORTERS[export_format](query))
+    if _parse_bool(request.args.get("gzip")):
+        body = gzip_stream(body)
+        mimetype, filename = "application/gzip", filename + ".gz"
+
+    response = Response(stream_with_context(body), mimetype=mimetype)
+    response.headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
 @api_bp.route("/api/stats")
 @api_auth_required
+@rate_limited("read")
+@conditional
 def stats():
     """Get statistics."""
-    total = SavedItem.query.filter_by(user_id=g.api_user.id).count()
-    reviewed = SavedItem.query.filter_by(user_id=g.api_user.id, reviewed=True).count()
+    def compute():
+        facets = get_facets(g.api_user.id)
+        return {
+            "total": facet_count(facets, "total"),
+            "reviewed": facet_count(facets, "reviewed"),
+            "by_type": facets["item_type"],
+            "categories": len(facets["category"]),
+        }
 
-    by_type = {}
-    type_counts = db.session.query(
-        SavedItem.item_type, func.count(SavedItem.id)
-    ).filter_by(user_id=g.api_user.id).group_by(SavedItem.item_type).all()
+    return jsonify({
+        **cached_result(g.api_user.id, "stats", {}, compute),
+        **get_sync_state(g.api_user.id),
+    })
 
-    for item_type, count in type_counts:
-        by_type[item_type] = count
 
-    categories = db.session.query(SavedItem.category).filter_by(
-        user_id=g.api_user.id
-    ).distinct().count()
+@api_bp.route("/api/cache/stats")
+@api_auth_required
+@rate_limited("read")
+def cache_stats():
+    """Get result cache hit/miss/eviction counters for this process (or Redis).
 
-    return jsonify({
-        "total": total,
-        "reviewed": reviewed,
-        "by_type": by_type,
-        "categories": categories,
-        "last_sync": g.api_user.last_sync_at.isoformat() if g.api_user.last_sync_at else None,
-        "sync_in_progress": g.api_user.sync_in_progress,
-    })
+    The counters are global rather than per user, so the endpoint only
+    exists when RESULT_CACHE_STATS_ENDPOINT is enabled.
+    """
+    if not current_app.config.get("RESULT_CACHE_STATS_ENDPOINT"):
+        return jsonify({"error": "Not found"}), 404
+    cache = get_result_cache()
+    if cache is None:
+        return jsonify({"backend": None})
+    return jsonify(cache.snapshot())
 
 
 @api_bp.route("/api/sync", methods=["POST"])
 @api_auth_required
+@rate_limited("sync")
 def trigger_sync():
-    """Trigger a sync of saved items."""
-    if g.api_user.sync_in_progress:
+    """Queue a sync of saved items and return the job id.
+
+    The job claims the user atomically when it starts, so a request that
+    races past this check cannot start a second crawl.
+    """
+    if get_sync_state(g.api_user.id)["sync_in_progress"]:
         return jsonify({"error": "Sync already in progress"}), 409
 
-    full_sync = request.json.get("full", False) if request.json else False
+    data = request.get_json(silent=True) or {}
+    full_sync = data.get("full", False)
+    mode = data.get("mode", "saved")
+    if mode not in ("saved", "metadata"):
+        return jsonify({"error": "mode must be 'saved' or 'metadata'"}), 400
+    since_days = data.get("since_days")
+    if since_days is not None and (
+            isinstance(since_days, bool) or not isinstance(since_days, int) or since_days < 1):
+        return jsonify({"error": "since_days must be a positive integer"}), 400
+    force_prune = data.get("force_prune", False)
+    if force_prune is not False and (force_prune is not True or not full_sync or mode != "saved"):
+        return jsonify({"error": "force_prune must be true and needs a full saved sync"}), 400
 
-    from .sync import sync_user_items
-    result = sync_user_items(g.api_user.id, full_sync)
+    from .jobs import enqueue_sync
+    job_id = enqueue_sync(g.api_user.id, full_sync, mode, since_days, force_prune)
 
-    return jsonify(result)
+    return jsonify({"status": "queued", "job_id": job_id}), 202
+
+
+@api_bp.route("/api/sync/jobs/<job_id>")
+@api_auth_required
+@rate_limited("read")
+def sync_job_status(job_id):
+    """Get the status and result of a queued sync job."""
+    from .jobs import get_job
+    job = get_job(job_id)
+
+    if not job or job["user_id"] != g.api_user.id:
+        return jsonify({"error": "Job not found"}), 404
+
+    return jsonify({
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "result": job["result"],
+    })
 
 
 @api_bp.route("/api/item/<item_id>/unsave", methods=["POST"])
 @api_auth_required
+@rate_limited("mutate")
 def unsave_item(item_id):
     """Unsave an item from Reddit and remove from local database."""
     from .sync import unsave_user_item
@@ -97,12 +395,11 @@ def unsave_item(item_id):
 
 @api_bp.route("/api/sync/status")
 @api_auth_required
+@rate_limited("read")
+@conditional
 def sync_status():
     """Get current sync status."""
-    return jsonify({
-        "sync_in_progress": g.api_user.sync_in_progress,
-        "last_sync": g.api_user.last_sync_at.isoformat() if g.api_user.last_sync_at else None,
-    })
+    return jsonify(get_sync_state(g.api_user.id))
 
 
 @api_bp.route("/settings/api-keys")
@@ -111,7 +408,18 @@ def api_keys_page():
     """API keys management page."""
     from flask import render_template
     keys = ApiKey.query.filter_by(user_id=current_user.id).order_by(ApiKey.created_at.desc()).all()
-    return render_template("api_keys.html", keys=keys)
+    return render_template(
+        "api_keys.html", keys=keys, last_used=_last_used(keys),
+        usage=get_api_usage(k.id for k in keys), usage_shared=api_usage_is_shared(),
+        limits=api_rate_limits(current_app.config),
+        limit_window=current_app.config.get("API_RATE_LIMIT_WINDOW", 60),
+    )
+
+
+def _last_used(keys: list[ApiKey]) -> dict:
+    """Last use per key id, including uses not yet written to the database."""
+    pending = get_key_usage().pending()
+    return {k.id: pending.get(k.id) or k.last_used_at for k in keys}
 
 
 @api_bp.route("/api/keys", methods=["POST"])
@@ -146,12 +454,15 @@ def create_api_key():
 def list_api_keys():
     """List user's API keys (masked)."""
     keys = ApiKey.query.filter_by(user_id=current_user.id).order_by(ApiKey.created_at.desc()).all()
+    last_used = _last_used(keys)
+    usage = get_api_usage(k.id for k in keys)
     return jsonify([{
         "id": k.id,
         "name": k.name,
         "created_at": k.created_at.isoformat(),
-        "last_used_at": k.last_used_at.isoformat() if k.last_used_at else None,
+        "last_used_at": last_used[k.id].isoformat() if last_used[k.id] else None,
         "is_active": k.is_active,
+        "usage_today": usage[k.id],
     } for k in keys])
 
 
@@ -162,4 +473,5 @@ def revoke_api_key(key_id):
     api_key = ApiKey.query.filter_by(id=key_id, user_id=current_user.id).first_or_404()
     api_key.is_active = False
     db.session.commit()
+    invalidate_api_key(api_key.key_hash)
     return jsonify({"success": True})
@@ -1,15 +1,108 @@
 """API key authentication for programmatic access."""
 
+import atexit
 import hashlib
 import secrets
+import threading
+import time
 from datetime import datetime
 from functools import wraps
 
-from flask import g, jsonify, request
+from flask import current_app, g, jsonify, request
 from flask_login import current_user
+from sqlalchemy import update
 
+from .cache import MemoryResultCache
 from .extensions import db
-from .models import ApiKey, User
+from .identity import CachedUser, load_identity
+from .models import ApiKey
+
+
+class KeyUsageBuffer:
+    """
+    Collects API key last_used_at times and writes them in one batch.
+
+    A daemon thread flushes every `interval` seconds (and once at exit), so
+    authenticated requests themselves never write. With an interval of 0
+    every use is written immediately.
+    """
+
+    def __init__(self, app, interval: float):
+        self.app = app
+        self.interval = interval
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._exit_hook_registered = False
+
+    def record(self, key_id: int, when: datetime):
+        if self.interval <= 0:
+            self._write({key_id: when})
+            return
+        with self._lock:
+            self._pending[key_id] = when
+            # Started lazily so it runs in the worker, not a pre-fork parent
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="api-key-usage", daemon=True)
+                self._thread.start()
+                if not self._exit_hook_registered:
+                    atexit.register(self._flush_in_context)
+                    self._exit_hook_registered = True
+
+    def pending(self) -> dict[int, datetime]:
+        """Uses not yet written, by key id."""
+        with self._lock:
+            return dict(self._pending)
+
+    def flush(self) -> int:
+        """Write pending uses in one UPDATE. Returns the number of keys written."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if pending:
+            self._write(pending)
+        return len(pending)
+
+    def _write(self, uses: dict[int, datetime]):
+        db.session.execute(update(ApiKey), [
+            {"id": key_id, "last_used_at": when} for key_id, when in uses.items()
+        ])
+        db.session.commit()
+
+    def _flush_in_context(self):
+        with self.app.app_context():
+            try:
+                self.flush()
+            except Exception as e:
+                db.session.rollback()
+                self.app.logger.warning("Failed to write API key usage: %s", e)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            self._flush_in_context()
+
+
+def _key_cache() -> MemoryResultCache:
+    app = current_app._get_current_object()
+    if "api_key_cache" not in app.extensions:
+        app.extensions["api_key_cache"] = MemoryResultCache(
+            app.config.get("API_KEY_CACHE_MAX_ENTRIES", 1024),
+            ttl=app.config.get("API_KEY_CACHE_TTL", 60),
+        )
+    return app.extensions["api_key_cache"]
+
+
+def get_key_usage() -> KeyUsageBuffer:
+    """Return the app's buffer of API key uses."""
+    app = current_app._get_current_object()
+    if "api_key_usage" not in app.extensions:
+        app.extensions["api_key_usage"] = KeyUsageBuffer(app, app.config.get("API_KEY_USAGE_FLUSH_SECONDS", 60))
+    return app.extensions["api_key_usage"]
+
+
+def invalidate_api_key(key_hash: str):
+    """Drop a key from this process's verification cache (call on revoke)."""
+    _key_cache().delete(key_hash)
 
 
 def generate_api_key() -> tuple[str, str]:
@@ -23,22 +116,30 @@ def generate_api_key() -> tuple[str, str]:
     return raw_key, key_hash
 
 
-def verify_api_key(raw_key: str) -> User | None:
+def verify_api_key(raw_key: str) -> CachedUser | None:
     """Verify an API key and return the associated user.
 
+    Active keys are cached by hash for API_KEY_CACHE_TTL seconds (which
+    bounds how long a key revoked in another process stays usable), and
+    the use is buffered rather than written, so verification does not write.
+
     Returns:
-        User instance if valid, None otherwise.
+        The key owner's CachedUser if valid, None otherwise.
     """
     key_hash = hashlib.sha256(raw_key.encode()).hexdigest()
-    api_key = ApiKey.query.filter_by(key_hash=key_hash, is_active=True).first()
-
-    if not api_key:
-        return None
-
-    api_key.last_used_at = datetime.utcnow()
-    db.session.commit()
-
-    return api_key.user
+    cache = _key_cache()
+    cached = cache.get(key_hash)
+    if cached is None:
+        api_key = ApiKey.query.filter_by(key_hash=key_hash, is_active=True).first()
+        if not api_key:
+            return None
+        cached = (api_key.id, api_key.user_id)
+        cache.set(key_hash, cached)
+
+    key_id, user_id = cached
+    g.api_key_id = key_id
+    get_key_usage().record(key_id, datetime.utcnow())
+    return load_identity(user_id)
 
 
 def api_auth_required(f):
@@ -3,13 +3,20 @@
 
 import os
 
+import click
 from flask import Flask
+from sqlalchemy import inspect, text, update
 from .config import Config
 from .extensions import db, login_manager
-from .models import User
+from .models import SavedItem, make_preview
 from .auth import auth_bp
 from .views import views_bp
 from .api import api_bp
+from .facets import rebuild_facets_command
+from .identity import load_identity
+from .scheduler import sync_all_command
+from .sync import recategorize_command
+from .search import init_search, rebuild_search_command
 
 
 def create_app(config_class=Config):
@@ -23,23 +30,105 @@ def create_app(config_class=Config):
 
     @login_manager.user_loader
     def load_user(user_id):
-        return User.query.get(int(user_id))
+        return load_identity(int(user_id))
 
     # Register blueprints
     app.register_blueprint(auth_bp)
     app.register_blueprint(views_bp)
     app.register_blueprint(api_bp)
 
+    # CLI commands
+    app.cli.add_command(sync_all_command)
+    app.cli.add_command(rebuild_search_command)
+    app.cli.add_command(rebuild_facets_command)
+    app.cli.add_command(recategorize_command)
+    app.cli.add_command(backfill_previews_command)
+
     # Create database tables (handled gracefully for multi-worker setup)
     with app.app_context():
         try:
             db.create_all()
+            added = _add_missing_columns()
+            _add_missing_indexes()
+            # Only the worker that adds the column fills it; an interrupted
+            # backfill is finished with `flask backfill-previews`
+            if (SavedItem.__tablename__, "preview") in added:
+                _backfill_previews()
         except Exception as e:
             app.logger.debug("Database tables may already exist: %s", e)
+        init_search(app)
 
     return app
 
 
+def _add_missing_columns() -> set[tuple[str, str]]:
+    """Add model columns that are missing from already-created tables.
+
+    db.create_all() only creates missing tables, so columns added to a model
+    after a database was first created are applied here with ALTER TABLE.
+
+    Returns:
+        (table, column) names of the columns that were added
+    """
+    added = set()
+    inspector = inspect(db.engine)
+    preparer = db.engine.dialect.identifier_preparer
+
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            ddl = f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {preparer.format_column(column)} "
+            ddl += column.type.compile(dialect=db.engine.dialect)
+            db.session.execute(text(ddl))
+            added.add((table.name, column.name))
+    db.session.commit()
+    return added
+
+
+def _add_missing_indexes():
+    """Create model indexes that are missing from already-created tables."""
+    inspector = inspect(db.engine)
+
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing:
+                index.create(db.engine)
+
+
+def _backfill_previews(batch_size: int = 1000) -> int:
+    """Fill SavedItem.preview for rows stored before the column existed.
+
+    Returns:
+        Number of items updated
+    """
+    columns = (SavedItem.id, SavedItem.item_type, SavedItem.is_self,
+               SavedItem.selftext, SavedItem.body, SavedItem.url)
+    updated = 0
+    while True:
+        rows = db.session.query(*columns).filter(SavedItem.preview.is_(None)).limit(batch_size).all()
+        if not rows:
+            break
+        db.session.execute(update(SavedItem), [
+            {"id": item_id, "preview": make_preview(*fields)} for item_id, *fields in rows
+        ])
+        db.session.commit()
+        updated += len(rows)
+    return updated
+
+
+@click.command("backfill-previews")
+def backfill_previews_command():
+    """Fill list previews for items stored before previews existed."""
+    click.echo(f"Backfilled previews for {_backfill_previews()} item(s)")
+
+
 # For gunicorn: create_app() returns the app
 app = create_app()
 
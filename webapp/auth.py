@@ -7,7 +7,10 @@ from datetime import datetime, timedelta
 from flask import Blueprint, redirect, request, session, flash, current_app
 from flask_login import login_user, logout_user, login_required, current_user
 from .extensions import db
+from .identity import invalidate_user
 from .models import User
+from .ratelimit import RateLimitWaitTooLong, get_reddit_limiter, reddit_limit_key
+from .transport import get_transport
 
 auth_bp = Blueprint("auth", __name__, url_prefix="/auth")
 
@@ -85,6 +88,7 @@ def callback():
     user.updated_at = datetime.utcnow()
 
     db.session.commit()
+    invalidate_user(user.id)
 
     # Log in user
     login_user(user, remember=True)
@@ -101,6 +105,7 @@ def callback():
 @login_required
 def logout():
     """Log out user."""
+    invalidate_user(current_user.id)
     logout_user()
     flash("You have been logged out.", "info")
     return redirect("/")
@@ -124,12 +129,13 @@ def exchange_code_for_tokens(code: str) -> dict | None:
     }
 
     try:
-        response = requests.post(
+        # Not retried: an authorization code can only be redeemed once
+        response = get_transport(current_app.config).request(
+            "POST",
             "https://www.reddit.com/api/v1/access_token",
             auth=auth,
             data=data,
             headers=headers,
-            timeout=30,
         )
 
         if response.status_code == 200:
@@ -150,16 +156,21 @@ def get_reddit_user_info(access_token: str) -> dict | None:
     }
 
     try:
-        response = requests.get(
+        response = get_transport(current_app.config).request(
+            "GET",
             "https://oauth.reddit.com/api/v1/me",
+            limiter=get_reddit_limiter(),
+            limit_key=reddit_limit_key(current_app.config),
+            limit_wait=current_app.config.get("REDDIT_REQUEST_MAX_WAIT", 5),
             headers=headers,
-            timeout=30,
         )
 
         if response.status_code == 200:
             return response.json()
 
         current_app.logger.error("User info request failed: %d", response.status_code)
+    except RateLimitWaitTooLong as e:
+        current_app.logger.error("User info request skipped: %s", e)
     except requests.RequestException:
         current_app.logger.error("User info request failed")
 
@@ -186,12 +197,14 @@ def refresh_access_token(user: User) -> bool:
     }
 
     try:
-        response = requests.post(
+        # Permanent refresh tokens are reusable, so a retry is harmless
+        response = get_transport(current_app.config).request(
+            "POST",
             "https://www.reddit.com/api/v1/access_token",
+            idempotent=True,
             auth=auth,
             data=data,
             headers=headers,
-            timeout=30,
         )
 
         if response.status_code == 200:
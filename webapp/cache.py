@@ -0,0 +1,262 @@
+"""Caching keyed on a per-user data version.
+
+Every write to a user's items bumps users.data_version in the same
+transaction. Cacheable GET routes derive a strong ETag from that version
+(plus sync state and the request URL), so a revalidation costs one
+primary-key lookup and answers 304 without running the view.
+
+Query results are cached the same way: the key includes the version, so a
+change to the user's items makes every older entry unreachable and it ages
+out of the LRU (in process) or its TTL (Redis).
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from functools import wraps
+
+from flask import current_app, g, make_response, request, session
+from flask_login import current_user
+from sqlalchemy import func, update
+
+from .extensions import db, get_redis
+from .models import User
+
+
+def bump_data_version(user_id: int):
+    """Mark a user's data as changed. Does not commit."""
+    db.session.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(
+            data_version=func.coalesce(User.data_version, 0) + 1,
+            data_updated_at=datetime.utcnow(),
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _request_user_id() -> int | None:
+    user = g.get("api_user")
+    if user is None and current_user.is_authenticated:
+        user = current_user
+    return user.id if user is not None else None
+
+
+def _validators(user_id: int) -> tuple[str, datetime | None, bool] | None:
+    """
+    Validators for the current request.
+
+    Returns:
+        Tuple of (strong ETag, Last-Modified, sync running), or None if the
+        user no longer exists
+    """
+    row = db.session.query(
+        User.data_version, User.data_updated_at, User.last_sync_at,
+        User.sync_in_progress, User.sync_lease_expires_at,
+    ).filter(User.id == user_id).first()
+    if row is None:
+        return None
+
+    version, updated_at, last_sync_at, in_progress, lease_expires_at = row
+    g.data_version = version or 0
+    running = bool(in_progress and lease_expires_at and datetime.utcnow() < lease_expires_at)
+    basis = f"{user_id}:{version or 0}:{running}:{last_sync_at}:{request.full_path}"
+    etag = hashlib.sha256(basis.encode()).hexdigest()[:32]
+    last_modified = max(filter(None, (updated_at, last_sync_at)), default=None)
+    if last_modified:
+        last_modified = last_modified.replace(microsecond=0)
+    return etag, last_modified, running
+
+
+def conditional(f):
+    """
+    Answer GET requests with 304 Not Modified while the user's data is unchanged.
+
+    Place below the auth decorator. Responses carry a strong ETag and, once
+    the user has synced or changed data, Last-Modified. Pages with
+    pending flash messages are never cached since they render one-off content.
+    """
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        user_id = _request_user_id()
+        if request.method != "GET" or user_id is None or session.get("_flashes"):
+            return f(*args, **kwargs)
+
+        validators = _validators(user_id)
+        if validators is None:
+            return f(*args, **kwargs)
+        etag, last_modified, running = validators
+
+        if request.if_none_match:
+            not_modified = request.if_none_match.contains(etag)
+        else:
+            # Sync state is not reflected in Last-Modified, so dates only
+            # validate while no sync is running
+            since = request.if_modified_since
+            not_modified = bool(
+                since and last_modified and not running
+                and last_modified <= since.replace(tzinfo=None)
+            )
+
+        if not_modified:
+            response = make_response("", 304)
+        else:
+            response = make_response(f(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+
+        response.set_etag(etag)
+        if last_modified:
+            response.last_modified = last_modified
+        # Always revalidate; the content is per-user
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response
+
+    return decorated
+
+
+class MemoryResultCache:
+    """Per-process LRU of JSON-able results with a TTL and an entry bound."""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    def get(self, key: str):
+        """Return the cached value, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.monotonic():
+                del self._entries[key]
+                self._stats["expirations"] += 1
+                entry = None
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry[1]
+
+    def set(self, key: str, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"backend": self.name, "entries": len(self._entries), **self._stats}
+
+
+class RedisResultCache:
+    """Result cache shared by all workers; counters live in a Redis hash."""
+
+    name = "redis"
+
+    def __init__(self, connection, ttl: float = 300, prefix: str = "result-cache:"):
+        self.connection = connection
+        self.ttl = ttl
+        self.prefix = prefix
+        self._stats_key = f"{prefix}stats"
+
+    def get(self, key: str):
+        """Return the cached value, or None on a miss."""
+        raw = self.connection.get(self.prefix + key)
+        self.connection.hincrby(self._stats_key, "hits" if raw is not None else "misses", 1)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key: str, value):
+        self.connection.set(self.prefix + key, json.dumps(value), ex=max(int(self.ttl), 1))
+
+    def delete(self, key: str):
+        self.connection.delete(self.prefix + key)
+
+    def clear(self):
+        keys = list(self.connection.scan_iter(match=f"{self.prefix}*"))
+        if keys:
+            self.connection.delete(*keys)
+
+    def snapshot(self) -> dict:
+        stats = {k.decode(): int(v) for k, v in self.connection.hgetall(self._stats_key).items()}
+        try:
+            # Redis evicts under maxmemory and reports it server-wide
+            evictions = int(self.connection.info("stats").get("evicted_keys", 0))
+        except Exception:
+            evictions = 0
+        return {
+            "backend": self.name,
+            "hits": stats.get("hits", 0),
+            "misses": stats.get("misses", 0),
+            "evictions": evictions,
+        }
+
+
+def get_result_cache():
+    """Return the app's result cache (Redis when reachable), or None if disabled."""
+    app = current_app._get_current_object()
+    if "result_cache" not in app.extensions:
+        ttl = app.config.get("RESULT_CACHE_TTL", 300)
+        backend = app.config.get("RESULT_CACHE_BACKEND", "auto")
+        connection = get_redis(app) if backend in ("auto", "redis") else None
+        if backend == "none" or ttl <= 0:
+            cache = None
+        elif connection is not None:
+            cache = RedisResultCache(connection, ttl=ttl)
+        else:
+            cache = MemoryResultCache(app.config.get("RESULT_CACHE_MAX_ENTRIES", 1024), ttl=ttl)
+        app.extensions["result_cache"] = cache
+    return app.extensions["result_cache"]
+
+
+def _data_version(user_id: int) -> int:
+    if "data_version" in g:
+        return g.data_version
+    version = db.session.query(User.data_version).filter(User.id == user_id).scalar()
+    return version or 0
+
+
+def cached_result(user_id: int, route: str, params: dict, compute):
+    """
+    Return compute() for these parameters, reusing a cached result.
+
+    Args:
+        user_id: Owner of the data; results never cross users
+        route: Name of the view or endpoint producing the result
+        params: Request parameters the result depends on
+        compute: Zero-argument callable returning a JSON-able value
+
+    Returns:
+        The cached or freshly computed value
+    """
+    cache = get_result_cache()
+    if cache is None:
+        return compute()
+
+    digest = hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()[:24]
+    key = f"{user_id}:{_data_version(user_id)}:{route}:{digest}"
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value)
+    return value
+
@@ -1,4 +1,10 @@
-"""Subreddit to category mapping."""
+"""Subreddit to category mapping.
+
+Shared by the web app and the standalone scripts, so this module must not
+import Flask or anything else outside the standard library.
+"""
+
+UNCATEGORIZED = "Uncategorized"
 
 # Map subreddits to categories
 CATEGORIES = {
@@ -111,14 +117,44 @@ CATEGORIES = {
 }
 
 
+def _build_index(categories: dict[str, list[str]]) -> dict[str, str]:
+    """Map each case-folded subreddit name to its category."""
+    index = {}
+    for category, subs in categories.items():
+        for sub in subs:
+            key = sub.casefold()
+            if index.get(key, category) != category:
+                raise ValueError(f"r/{sub} is mapped to both '{index[key]}' and '{category}'")
+            index[key] = category
+    return index
+
+
+# Subreddit names are case-insensitive on Reddit, so lookups are too
+_INDEX = _build_index(CATEGORIES)
+
+
 def categorize_subreddit(subreddit: str) -> str:
-    """Find the category for a subreddit."""
-    for category, subs in CATEGORIES.items():
-        if subreddit in subs:
-            return category
-    return "Uncategorized"
+    """Find the category for a subreddit (case-insensitive)."""
+    return _INDEX.get(subreddit.casefold(), UNCATEGORIZED)
+
+
+def categorize_many(subreddits) -> list[str]:
+    """
+    Categorize a batch of subreddit names, in order.
+
+    Each distinct name is folded and looked up once, which is what sync
+    pages and re-categorization runs mostly consist of.
+    """
+    seen = {}
+    categories = []
+    for subreddit in subreddits:
+        category = seen.get(subreddit)
+        if category is None:
+            category = seen[subreddit] = _INDEX.get(subreddit.casefold(), UNCATEGORIZED)
+        categories.append(category)
+    return categories
 
 
 def get_all_categories() -> list[str]:
     """Get all category names."""
-    return list(CATEGORIES.keys()) + ["Uncategorized"]
+    return list(CATEGORIES.keys()) + [UNCATEGORIZED]
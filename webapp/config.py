@@ -21,8 +21,69 @@ class Config:
     REDDIT_USER_AGENT = os.environ.get("REDDIT_USER_AGENT", "RedditSavedViewer/1.0")
     REDDIT_SCOPES = ("identity", "history", "read", "save")
 
+    # Reddit HTTP transport
+    REDDIT_HTTP_CONNECT_TIMEOUT = float(os.environ.get("REDDIT_HTTP_CONNECT_TIMEOUT", "5"))
+    REDDIT_HTTP_READ_TIMEOUT = float(os.environ.get("REDDIT_HTTP_READ_TIMEOUT", "30"))
+    REDDIT_HTTP_MAX_RETRIES = int(os.environ.get("REDDIT_HTTP_MAX_RETRIES", "3"))
+    REDDIT_HTTP_BACKOFF_BASE = float(os.environ.get("REDDIT_HTTP_BACKOFF_BASE", "1"))
+    REDDIT_HTTP_BACKOFF_CAP = float(os.environ.get("REDDIT_HTTP_BACKOFF_CAP", "30"))
+    REDDIT_HTTP_MAX_WAIT = float(os.environ.get("REDDIT_HTTP_MAX_WAIT", "60"))
+    REDDIT_HTTP_POOL_SIZE = int(os.environ.get("REDDIT_HTTP_POOL_SIZE", "10"))
+
+    # Reddit API budget per OAuth client id, shared via Redis when available
+    REDDIT_RATE_LIMIT = int(os.environ.get("REDDIT_RATE_LIMIT", "100"))
+    REDDIT_RATE_LIMIT_WINDOW = int(os.environ.get("REDDIT_RATE_LIMIT_WINDOW", "60"))
+    # Longest a web request (login, unsave) waits for that budget before
+    # failing; background syncs wait as long as needed
+    REDDIT_REQUEST_MAX_WAIT = float(os.environ.get("REDDIT_REQUEST_MAX_WAIT", "5"))
+
     # Session
     PERMANENT_SESSION_LIFETIME = timedelta(days=30)
 
-    # Redis/Dragonfly for RQ
+    # Redis/Dragonfly for RQ (falls back to an in-process queue if unreachable)
     REDIS_URL = os.environ.get("REDIS_URL", "redis://localhost:6379/0")
+    SYNC_WORKERS = int(os.environ.get("SYNC_WORKERS", "1"))
+    # A sync that stops renewing its claim for this long is treated as crashed
+    SYNC_LEASE_SECONDS = int(os.environ.get("SYNC_LEASE_SECONDS", "600"))
+
+    # Full syncs prefetch listing pages while persisting the previous one
+    SYNC_PIPELINE = os.environ.get("SYNC_PIPELINE", "1") == "1"
+    SYNC_PREFETCH_PAGES = int(os.environ.get("SYNC_PREFETCH_PAGES", "2"))
+    # Concurrent /api/info requests for metadata refreshes
+    SYNC_REFRESH_WORKERS = int(os.environ.get("SYNC_REFRESH_WORKERS", "4"))
+    # Full syncs delete local items that were unsaved on reddit.com
+    SYNC_PRUNE_UNSAVED = os.environ.get("SYNC_PRUNE_UNSAVED", "1") == "1"
+    # ...unless more than this fraction of local items would go, which
+    # points at a bad listing response rather than real unsaves
+    SYNC_PRUNE_MAX_FRACTION = float(os.environ.get("SYNC_PRUNE_MAX_FRACTION", "0.1"))
+
+    # Query result cache: auto (Redis when reachable, else per-process LRU),
+    # memory, redis or none
+    RESULT_CACHE_BACKEND = os.environ.get("RESULT_CACHE_BACKEND", "auto")
+    RESULT_CACHE_TTL = int(os.environ.get("RESULT_CACHE_TTL", "300"))
+    RESULT_CACHE_MAX_ENTRIES = int(os.environ.get("RESULT_CACHE_MAX_ENTRIES", "1024"))
+    # Serve the global (not per-user) cache counters at /api/cache/stats to
+    # any authenticated user or API key; off by default
+    RESULT_CACHE_STATS_ENDPOINT = os.environ.get("RESULT_CACHE_STATS_ENDPOINT", "0") == "1"
+
+    # API keys: verified keys are cached per process (TTL bounds revocation
+    # lag across workers); last_used_at is written in batches
+    API_KEY_CACHE_TTL = int(os.environ.get("API_KEY_CACHE_TTL", "60"))
+    API_KEY_CACHE_MAX_ENTRIES = int(os.environ.get("API_KEY_CACHE_MAX_ENTRIES", "1024"))
+    API_KEY_USAGE_FLUSH_SECONDS = float(os.environ.get("API_KEY_USAGE_FLUSH_SECONDS", "60"))
+
+    # Identity (id, username) of authenticated users, cached per process
+    USER_CACHE_TTL = int(os.environ.get("USER_CACHE_TTL", "60"))
+    USER_CACHE_MAX_ENTRIES = int(os.environ.get("USER_CACHE_MAX_ENTRIES", "4096"))
+
+    # API requests per key per window by route class (0 disables a class);
+    # a user's keys and browser session share FACTOR times that budget
+    API_RATE_LIMIT_WINDOW = int(os.environ.get("API_RATE_LIMIT_WINDOW", "60"))
+    API_RATE_LIMIT_READ = int(os.environ.get("API_RATE_LIMIT_READ", "120"))
+    API_RATE_LIMIT_MUTATE = int(os.environ.get("API_RATE_LIMIT_MUTATE", "60"))
+    API_RATE_LIMIT_SYNC = int(os.environ.get("API_RATE_LIMIT_SYNC", "6"))
+    API_USER_RATE_LIMIT_FACTOR = int(os.environ.get("API_USER_RATE_LIMIT_FACTOR", "2"))
+
+    # flask sync-all
+    SCHEDULER_WORKERS = int(os.environ.get("SCHEDULER_WORKERS", "2"))
+    SCHEDULER_INTERVAL = int(os.environ.get("SCHEDULER_INTERVAL", "900"))
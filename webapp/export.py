@@ -0,0 +1,183 @@
+"""Streaming exports of a user's saved items.
+
+Rows are read as plain column tuples through a server-side cursor
+(yield_per) and formatted one at a time, so an export of any size runs in
+constant memory and the first bytes go out before the query finishes.
+"""
+
+import csv
+import io
+import json
+import zlib
+
+from sqlalchemy import func
+
+from .models import SavedItem
+
+# Rows fetched per round trip from the server-side cursor
+EXPORT_BATCH_SIZE = 500
+
+# Exported fields, named like export_saved.py's JSON plus local state
+EXPORT_COLUMNS = {
+    "type": SavedItem.item_type,
+    "id": SavedItem.reddit_id,
+    "title": SavedItem.title,
+    "post_title": SavedItem.post_title,
+    "subreddit": SavedItem.subreddit,
+    "category": SavedItem.category,
+    "url": SavedItem.url,
+    "permalink": SavedItem.permalink,
+    "author": SavedItem.author,
+    "score": SavedItem.score,
+    "num_comments": SavedItem.num_comments,
+    "created_utc": SavedItem.created_utc,
+    "is_self": SavedItem.is_self,
+    "selftext": SavedItem.selftext,
+    "body": SavedItem.body,
+    "reviewed": SavedItem.reviewed,
+    "archived": SavedItem.archived,
+    "notes": SavedItem.notes,
+}
+
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "json": ("application/json", "json"),
+    "csv": ("text/csv", "csv"),
+    "markdown": ("text/markdown", "md"),
+}
+
+
+def iter_rows(query):
+    """Yield export dicts for a SavedItem query in batches from a server-side cursor."""
+    columns = [column.label(name) for name, column in EXPORT_COLUMNS.items()]
+    rows = query.with_entities(*columns).execution_options(yield_per=EXPORT_BATCH_SIZE)
+    for row in rows:
+        item = dict(row._mapping)
+        if item["created_utc"] is not None:
+            item["created_utc"] = item["created_utc"].isoformat()
+        yield item
+
+
+def _newest_first(query):
+    return query.order_by(SavedItem.created_utc.desc(), SavedItem.id.desc())
+
+
+def export_ndjson(query):
+    for item in iter_rows(_newest_first(query)):
+        yield json.dumps(item, ensure_ascii=False) + "\n"
+
+
+def export_json(query):
+    yield "["
+    for i, item in enumerate(iter_rows(_newest_first(query))):
+        yield ("," if i else "") + "\n" + json.dumps(item, ensure_ascii=False)
+    yield "\n]\n"
+
+
+def export_csv(query):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=list(EXPORT_COLUMNS))
+    writer.writeheader()
+    for item in iter_rows(_newest_first(query)):
+        writer.writerow(item)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def format_markdown_item(item: dict) -> str:
+    """Format a single item as markdown, as export_markdown.py does."""
+    lines = []
+
+    if item["type"] == "post":
+        title = item.get("title") or "Untitled"
+        lines.append(f"#### [{title}]({item['permalink']})")
+        lines.append(f"**r/{item['subreddit']}** · {item['score']} points · by u/{item['author']}")
+        lines.append(f"*{item['created_utc'][:10]}*")
+
+        if item.get("is_self") and item.get("selftext"):
+            text = item["selftext"][:300]
+            if len(item["selftext"]) > 300:
+                text += "..."
+            lines.append(f"\n> {text}")
+        elif not item.get("is_self") and item.get("url"):
+            lines.append(f"\n🔗 {item['url']}")
+    else:
+        lines.append(f"#### [Comment on: {item.get('post_title') or 'Unknown post'}]({item['permalink']})")
+        lines.append(f"**r/{item['subreddit']}** · {item['score']} points · by u/{item['author']}")
+        lines.append(f"*{item['created_utc'][:10]}*")
+
+        if item.get("body"):
+            body = item["body"][:300]
+            if len(item["body"]) > 300:
+                body += "..."
+            lines.append(f"\n> {body}")
+
+    return "\n".join(lines)
+
+
+def export_markdown(query):
+    """
+    One markdown document grouped by category, then subreddit.
+
+    Group sizes come from one GROUP BY up front; each category is then
+    streamed with its own query ordered by subreddit and date.
+    """
+    counts = query.with_entities(
+        SavedItem.category, SavedItem.subreddit, func.count(SavedItem.id)
+    ).group_by(SavedItem.category, SavedItem.subreddit).all()
+
+    by_category = {}
+    for category, subreddit, count in counts:
+        by_category.setdefault(category, {})[subreddit] = count
+    categories = sorted(by_category.items(), key=lambda kv: (-sum(kv[1].values()), kv[0] or ""))
+
+    yield "# Reddit Saved Items\n\n"
+    yield f"Total: {sum(count for _, _, count in counts)} items\n"
+
+    for category, subreddits in categories:
+        name = category or "Uncategorized"
+        yield f"\n## {name} ({sum(subreddits.values())})\n"
+
+        in_category = query.filter(
+            SavedItem.category == category if category is not None else SavedItem.category.is_(None)
+        )
+        current = None
+        ordered = in_category.order_by(SavedItem.subreddit, SavedItem.created_utc.desc(), SavedItem.id.desc())
+        for item in iter_rows(ordered):
+            if item["subreddit"] != current:
+                current = item["subreddit"]
+                yield f"\n### r/{current} ({subreddits.get(current, 0)})\n"
+            yield "\n" + format_markdown_item(item) + "\n\n---\n"
+
+
+EXPORTERS = {
+    "ndjson": export_ndjson,
+    "json": export_json,
+    "csv": export_csv,
+    "markdown": export_markdown,
+}
+
+
+def coalesce_chunks(chunks, size: int = 16384):
+    """Join small text chunks into writes of roughly size characters."""
+    pending, length = [], 0
+    for chunk in chunks:
+        pending.append(chunk)
+        length += len(chunk)
+        if length >= size:
+            yield "".join(pending)
+            pending, length = [], 0
+    if pending:
+        yield "".join(pending)
+
+
+def gzip_stream(chunks):
+    """Gzip a stream of text chunks incrementally."""
+    compressor = zlib.compressobj(wbits=31)  # 31 selects the gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield compressor.flush()
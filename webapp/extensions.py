@@ -1,5 +1,7 @@
 """Flask extensions initialization."""
 
+import logging
+
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 
@@ -9,3 +11,34 @@ login_manager = LoginManager()
 login_manager.login_view = "auth.login"
 login_manager.login_message = "Please log in to access this page."
 login_manager.login_message_category = "info"
+
+
+def get_redis(app):
+    """Return a shared Redis connection for REDIS_URL, or None if unavailable.
+
+    The result is cached on the app, so an unreachable server is only probed
+    once. Tests can install a fake connection in app.extensions["redis"].
+    """
+    if "redis" not in app.extensions:
+        app.extensions["redis"] = _connect_redis(app.config.get("REDIS_URL"))
+    return app.extensions["redis"]
+
+
+def _connect_redis(url: str | None):
+    """Connect and ping Redis, returning None when it cannot be used."""
+    if not url:
+        return None
+
+    try:
+        import redis
+    except ImportError:
+        logging.getLogger(__name__).info("redis package not installed; using in-process fallbacks")
+        return None
+
+    connection = redis.Redis.from_url(url, socket_connect_timeout=1)
+    try:
+        connection.ping()
+    except redis.RedisError:
+        logging.getLogger(__name__).info("Redis unavailable at %s; using in-process fallbacks", url)
+        return None
+    return connection
@@ -0,0 +1,197 @@
+"""Materialized per-user facet counts.
+
+Each user has one user_facets row per facet value (items per subreddit,
+category, subreddit within category and type, plus reviewed/archived/total
+counters). Writers apply
+count deltas in the same transaction as the item change; readers load the
+handful of rows instead of grouping over every saved item. A user whose
+facets were never built (e.g. an upgraded database) is rebuilt lazily on
+first read, and `flask rebuild-facets` reconciles everything on demand.
+"""
+
+from collections import Counter
+
+import click
+from sqlalchemy import delete, func, insert
+from sqlalchemy.exc import IntegrityError
+
+from .extensions import db
+from .models import SavedItem, User, UserFacet
+
+# Facets counted per distinct column value
+VALUE_FACETS = {
+    "subreddit": SavedItem.subreddit,
+    "category": SavedItem.category,
+    "item_type": SavedItem.item_type,
+}
+# Facets counting items where a boolean column is true
+FLAG_FACETS = {
+    "reviewed": SavedItem.reviewed,
+    "archived": SavedItem.archived,
+}
+# Columns an item's facet membership depends on
+FACET_COLUMNS = (SavedItem.subreddit, SavedItem.category, SavedItem.item_type,
+                 SavedItem.reviewed, SavedItem.archived)
+
+
+def item_facets(item) -> list[tuple[str, str]]:
+    """(facet, value) keys an item counts towards.
+
+    Args:
+        item: SavedItem, row dict or result row with the FACET_COLUMNS fields
+    """
+    get = item.get if isinstance(item, dict) else lambda name: getattr(item, name, None)
+    keys = [("total", "")]
+    keys += [(facet, get(facet) or "") for facet in VALUE_FACETS]
+    keys.append(("category_subreddit", category_subreddit_key(get("category"), get("subreddit"))))
+    keys += [(facet, "") for facet in FLAG_FACETS if get(facet)]
+    return keys
+
+
+def category_subreddit_key(category: str | None, subreddit: str) -> str:
+    """Facet value for a subreddit within a category (subreddits never contain '/')."""
+    return f"{category or ''}/{subreddit}"
+
+
+def category_subreddits(facets: dict, category: str) -> dict[str, int]:
+    """Item counts per subreddit within one category."""
+    prefix = f"{category}/"
+    return {
+        value[len(prefix):]: count
+        for value, count in facets["category_subreddit"].items()
+        if value.startswith(prefix) and "/" not in value[len(prefix):]
+    }
+
+
+def facet_deltas(items, sign: int = 1) -> Counter:
+    """Sum the facet keys of items into a delta Counter."""
+    deltas = Counter()
+    for item in items:
+        for key in item_facets(item):
+            deltas[key] += sign
+    return deltas
+
+
+def _facets_built(user_id: int) -> bool:
+    return db.session.get(UserFacet, (user_id, "total", "")) is not None
+
+
+def apply_facet_deltas(user_id: int, deltas: Counter):
+    """
+    Add count deltas to a user's facet rows. Does not commit.
+
+    Zero-count rows are removed (except the total, which marks the facets
+    as built). Users whose facets were never built are skipped; their first
+    read rebuilds them from the items.
+    """
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas or not _facets_built(user_id):
+        return
+
+    rows = [
+        {"user_id": user_id, "facet": facet, "value": value, "count": delta}
+        for (facet, value), delta in deltas.items()
+    ]
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as upsert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as upsert
+        stmt = upsert(UserFacet).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id", "facet", "value"],
+            set_={"count": UserFacet.count + stmt.excluded.count},
+        )
+        db.session.execute(stmt)
+    else:
+        for row in rows:
+            facet = db.session.get(UserFacet, (user_id, row["facet"], row["value"]))
+            if facet is None:
+                db.session.add(UserFacet(**row))
+            else:
+                facet.count += row["count"]
+        db.session.flush()
+
+    db.session.execute(
+        delete(UserFacet).where(
+            UserFacet.user_id == user_id,
+            UserFacet.facet != "total",
+            UserFacet.count <= 0,
+        ).execution_options(synchronize_session=False)
+    )
+
+
+def rebuild_facets(user_id: int):
+    """Recount all of a user's facets from saved_items. Does not commit."""
+    db.session.execute(delete(UserFacet).where(UserFacet.user_id == user_id))
+
+    base = db.session.query(func.count(SavedItem.id)).filter(SavedItem.user_id == user_id)
+    rows = [{"facet": "total", "value": "", "count": base.scalar()}]
+    for facet, column in VALUE_FACETS.items():
+        counts = db.session.query(column, func.count(SavedItem.id)).filter(
+            SavedItem.user_id == user_id
+        ).group_by(column)
+        rows += [{"facet": facet, "value": value or "", "count": count} for value, count in counts]
+    counts = db.session.query(SavedItem.category, SavedItem.subreddit, func.count(SavedItem.id)).filter(
+        SavedItem.user_id == user_id
+    ).group_by(SavedItem.category, SavedItem.subreddit)
+    rows += [
+        {"facet": "category_subreddit", "value": category_subreddit_key(category, subreddit), "count": count}
+        for category, subreddit, count in counts
+    ]
+    for facet, column in FLAG_FACETS.items():
+        count = base.filter(column.is_(True)).scalar()
+        if count:
+            rows.append({"facet": facet, "value": "", "count": count})
+
+    # NULL and '' categories both map to ''
+    merged = Counter()
+    for row in rows:
+        merged[(row["facet"], row["value"])] += row["count"]
+    db.session.execute(insert(UserFacet), [
+        {"user_id": user_id, "facet": facet, "value": value, "count": count}
+        for (facet, value), count in merged.items()
+    ])
+
+
+def get_facets(user_id: int) -> dict[str, dict[str, int]]:
+    """
+    Load a user's facet counts, building them first if they are missing.
+
+    Two first reads for the same user can race to build the rows; the
+    loser's insert conflicts on the primary key, so it rolls back and reads
+    the winner's rows instead.
+
+    Returns:
+        Dict of facet name to {value: count}; every facet key is present
+    """
+    facets = {name: {} for name in ("total", "category_subreddit", *VALUE_FACETS, *FLAG_FACETS)}
+    rows = UserFacet.query.filter_by(user_id=user_id).populate_existing().all()
+    if not any(row.facet == "total" for row in rows):
+        try:
+            rebuild_facets(user_id)
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+        rows = UserFacet.query.filter_by(user_id=user_id).populate_existing().all()
+
+    for row in rows:
+        facets.setdefault(row.facet, {})[row.value] = row.count
+    return facets
+
+
+def facet_count(facets: dict, facet: str, value: str = "") -> int:
+    """Count for one facet value, 0 if absent."""
+    return facets.get(facet, {}).get(value, 0)
+
+
+@click.command("rebuild-facets")
+@click.option("--user-id", type=int, default=None, help="Only rebuild this user.")
+def rebuild_facets_command(user_id):
+    """Recount materialized facet counts from saved_items."""
+    user_ids = [user_id] if user_id else [uid for (uid,) in db.session.query(User.id)]
+    for uid in user_ids:
+        rebuild_facets(uid)
+        db.session.commit()
+    click.echo(f"Rebuilt facets for {len(user_ids)} user(s)")
@@ -0,0 +1,63 @@
+"""Cached identities for authenticated requests.
+
+Flask-Login and API key auth both resolve a user id to a user on every
+request. They get a CachedUser instead of a User row: just the identity
+fields (never the OAuth tokens), cached per process for USER_CACHE_TTL
+seconds. Within a request Flask-Login keeps the loaded user on g, so each
+request does at most one lookup, and usually none.
+
+Sync state is deliberately left out: it changes in worker processes this
+cache cannot hear about, so handlers that report it read it fresh
+(sync.get_sync_state). Code that needs tokens or writes to the user still
+loads the User row itself.
+"""
+
+from flask import current_app
+from flask_login import UserMixin
+
+from .cache import MemoryResultCache
+from .extensions import db
+from .models import User
+
+# User columns copied into a CachedUser
+IDENTITY_COLUMNS = (User.id, User.username)
+
+
+class CachedUser(UserMixin):
+    """Identity fields of a User, safe to share between requests."""
+
+    def __init__(self, id, username):
+        self.id = id
+        self.username = username
+
+
+def _user_cache() -> MemoryResultCache:
+    app = current_app._get_current_object()
+    if "user_cache" not in app.extensions:
+        app.extensions["user_cache"] = MemoryResultCache(
+            app.config.get("USER_CACHE_MAX_ENTRIES", 4096),
+            ttl=app.config.get("USER_CACHE_TTL", 60),
+        )
+    return app.extensions["user_cache"]
+
+
+def load_identity(user_id: int) -> CachedUser | None:
+    """Return the cached identity for a user id, loading it on a miss.
+
+    Returns:
+        CachedUser, or None if the user does not exist
+    """
+    cache = _user_cache()
+    identity = cache.get(f"user:{user_id}")
+    if identity is None:
+        row = db.session.query(*IDENTITY_COLUMNS).filter(User.id == user_id).first()
+        if row is None:
+            return None
+        identity = CachedUser(*row)
+        cache.set(f"user:{user_id}", identity)
+    return identity
+
+
+def invalidate_user(user_id: int):
+    """Drop a user's cached identity in this process (call on login and logout)."""
+    _user_cache().delete(f"user:{user_id}")
@@ -0,0 +1,150 @@
+"""Background job queue for Reddit syncs.
+
+Jobs go to an RQ queue on REDIS_URL when Redis is reachable, otherwise to
+an in-process thread pool so a single-container install still works.
+"""
+
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import delete, update
+
+from .extensions import db, get_redis
+from .models import SyncJob
+
+QUEUE_NAME = "sync"
+
+# How long finished job results stay queryable
+RESULT_TTL = 24 * 60 * 60
+
+
+def run_sync_job(user_id: int, full_sync: bool = False, mode: str = "saved",
+                 since_days: int = None, force_prune: bool = False) -> dict:
+    """Job body: run a sync inside the worker's app context."""
+    from .sync import sync_user_items
+    return sync_user_items(user_id, full_sync, mode, since_days, force_prune)
+
+
+class InProcessQueue:
+    """
+    Thread-pool queue used when Redis is not available.
+
+    Jobs run in the process that enqueued them, but their status is kept in
+    the sync_jobs table so a poll landing on another gunicorn worker still
+    finds it.
+    """
+
+    def __init__(self, app, max_workers: int = 1, is_async: bool = True):
+        self.app = app
+        self.is_async = is_async
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="sync-job")
+
+    def enqueue(self, func, *args, user_id: int) -> str:
+        job_id = uuid.uuid4().hex
+        db.session.execute(
+            delete(SyncJob).where(SyncJob.created_at < datetime.utcnow() - timedelta(seconds=RESULT_TTL))
+        )
+        db.session.add(SyncJob(id=job_id, user_id=user_id, status="queued"))
+        db.session.commit()
+
+        if self.is_async:
+            self._executor.submit(self._run, job_id, func, args)
+        else:
+            self._run(job_id, func, args)
+        return job_id
+
+    def _run(self, job_id: str, func, args: tuple):
+        with self.app.app_context():
+            self._set(job_id, status="started")
+            try:
+                result = func(*args)
+            except Exception as e:
+                db.session.rollback()
+                self.app.logger.error(f"Sync job {job_id} failed: {e}")
+                self._set(job_id, status="failed", result={"error": str(e)})
+            else:
+                self._set(job_id, status="finished", result=result)
+
+    def _set(self, job_id: str, **fields):
+        db.session.execute(update(SyncJob).where(SyncJob.id == job_id).values(**fields))
+        db.session.commit()
+
+    def fetch(self, job_id: str) -> dict | None:
+        job = db.session.get(SyncJob, job_id, populate_existing=True)
+        if job is None:
+            return None
+        return {"job_id": job.id, "user_id": job.user_id, "status": job.status, "result": job.result}
+
+
+class RedisQueue:
+    """RQ-backed queue shared by all web processes and workers."""
+
+    def __init__(self, connection, is_async: bool = True):
+        from rq import Queue
+        self.connection = connection
+        self.queue = Queue(QUEUE_NAME, connection=connection, is_async=is_async)
+
+    def enqueue(self, func, *args, user_id: int) -> str:
+        job = self.queue.enqueue(
+            func, *args,
+            meta={"user_id": user_id},
+            result_ttl=RESULT_TTL,
+            failure_ttl=RESULT_TTL,
+        )
+        return job.id
+
+    def fetch(self, job_id: str) -> dict | None:
+        from rq.exceptions import NoSuchJobError
+        from rq.job import Job
+
+        try:
+            job = Job.fetch(job_id, connection=self.connection)
+        except NoSuchJobError:
+            return None
+
+        status = job.get_status()
+        result = job.return_value() if status == "finished" else None
+        if status == "failed":
+            result = {"error": "Sync job failed"}
+
+        return {
+            "job_id": job.id,
+            "user_id": job.meta.get("user_id"),
+            "status": str(getattr(status, "value", status)),
+            "result": result,
+        }
+
+
+def get_sync_queue():
+    """Return the app's sync queue, creating it on first use."""
+    app = current_app._get_current_object()
+    if "sync_queue" not in app.extensions:
+        is_async = app.config.get("SYNC_QUEUE_ASYNC", True)
+        connection = get_redis(app)
+        if connection is not None:
+            try:
+                app.extensions["sync_queue"] = RedisQueue(connection, is_async=is_async)
+            except ImportError:
+                connection = None
+        if connection is None:
+            app.extensions["sync_queue"] = InProcessQueue(
+                app,
+                max_workers=app.config.get("SYNC_WORKERS", 1),
+                is_async=is_async,
+            )
+    return app.extensions["sync_queue"]
+
+
+def enqueue_sync(user_id: int, full_sync: bool = False, mode: str = "saved",
+                 since_days: int = None, force_prune: bool = False) -> str:
+    """Queue a sync for a user and return its job id."""
+    return get_sync_queue().enqueue(
+        run_sync_job, user_id, full_sync, mode, since_days, force_prune, user_id=user_id,
+    )
+
+
+def get_job(job_id: str) -> dict | None:
+    """Look up a queued sync job's status and result."""
+    return get_sync_queue().fetch(job_id)
@@ -2,8 +2,12 @@
 
 from datetime import datetime
 from flask_login import UserMixin
+from sqlalchemy.orm import deferred
 from .extensions import db
 
+# Characters of selftext/body kept in SavedItem.preview
+PREVIEW_LENGTH = 200
+
 
 class User(db.Model, UserMixin):
     """Reddit user who authenticated via OAuth."""
@@ -22,6 +26,14 @@ class User(db.Model, UserMixin):
     # Sync tracking
     last_sync_at = db.Column(db.DateTime, nullable=True)
     sync_in_progress = db.Column(db.Boolean, default=False)
+    # A claimed sync that is not renewed by this time is considered crashed
+    sync_lease_expires_at = db.Column(db.DateTime, nullable=True)
+    # Newest saved fullname seen by the last completed sync
+    sync_high_water_mark = db.Column(db.String(20), nullable=True)
+
+    # Bumped on every change to the user's items; drives HTTP validators
+    data_version = db.Column(db.Integer, default=0)
+    data_updated_at = db.Column(db.DateTime, nullable=True)
 
     # Timestamps
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -40,6 +52,12 @@ class User(db.Model, UserMixin):
         from datetime import timedelta
         return datetime.utcnow() >= (self.token_expires_at - timedelta(minutes=5))
 
+    def is_sync_running(self) -> bool:
+        """Check if a sync holds an unexpired claim on this user."""
+        if not self.sync_in_progress or not self.sync_lease_expires_at:
+            return False
+        return datetime.utcnow() < self.sync_lease_expires_at
+
 
 class ApiKey(db.Model):
     """API key for programmatic access."""
@@ -57,6 +75,22 @@ class ApiKey(db.Model):
     user = db.relationship("User", backref=db.backref("api_keys", lazy="dynamic"))
 
 
+class SyncJob(db.Model):
+    """Status of a sync job run by the in-process queue.
+
+    Stored in the database so any web process can answer a status poll,
+    not just the one whose thread runs the job. RQ jobs live in Redis.
+    """
+
+    __tablename__ = "sync_jobs"
+
+    id = db.Column(db.String(32), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False, index=True)
+    status = db.Column(db.String(20), nullable=False, default="queued")
+    result = db.Column(db.JSON, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+
 class SavedItem(db.Model):
     """A saved post or comment from Reddit."""
 
@@ -81,15 +115,22 @@ class SavedItem(db.Model):
 
     # Post-specific fields
     title = db.Column(db.Text, nullable=True)
-    url = db.Column(db.Text, nullable=True)
-    selftext = db.Column(db.Text, nullable=True)
     is_self = db.Column(db.Boolean, nullable=True)
     num_comments = db.Column(db.Integer, nullable=True)
 
     # Comment-specific fields
-    body = db.Column(db.Text, nullable=True)
     post_title = db.Column(db.Text, nullable=True)
 
+    # Large text, deferred so list pages don't load it; accessing one loads
+    # the whole group, and export paths undefer_group("text") up front
+    url = deferred(db.Column(db.Text, nullable=True), group="text")
+    selftext = deferred(db.Column(db.Text, nullable=True), group="text")
+    body = deferred(db.Column(db.Text, nullable=True), group="text")
+
+    # What list pages show: a selftext/body excerpt, or the link of a link
+    # post ('' when there is nothing to show, NULL until backfilled)
+    preview = db.Column(db.Text, nullable=True)
+
     # Categorization
     category = db.Column(db.String(100), nullable=True, index=True)
 
@@ -99,9 +140,40 @@ class SavedItem(db.Model):
     # User state (embedded for simplicity)
     reviewed = db.Column(db.Boolean, default=False)
     archived = db.Column(db.Boolean, default=False)
-    notes = db.Column(db.Text, nullable=True)
+    notes = deferred(db.Column(db.Text, nullable=True), group="text")
 
     __table_args__ = (
         db.UniqueConstraint("user_id", "reddit_id", name="uq_user_reddit_item"),
         db.Index("ix_saved_items_user_category", "user_id", "category"),
+        db.Index("ix_saved_items_user_created", "user_id", "created_utc", "id"),
     )
+
+
+def make_preview(item_type: str, is_self: bool | None, selftext: str | None,
+                 body: str | None, url: str | None) -> str:
+    """Build the list-page preview for an item's text fields."""
+    text = selftext if item_type == "post" else body
+    if text:
+        return text[:PREVIEW_LENGTH] + ("..." if len(text) > PREVIEW_LENGTH else "")
+    if item_type == "post" and not is_self and url:
+        return url
+    return ""
+
+
+class UserFacet(db.Model):
+    """Materialized per-user item count for one facet value.
+
+    Kept up to date incrementally by sync, unsave and state changes so
+    that navigation and stats read O(facets) rows instead of scanning items.
+    """
+
+    __tablename__ = "user_facets"
+
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), primary_key=True)
+    # 'total', 'subreddit', 'category', 'category_subreddit', 'item_type',
+    # 'reviewed' or 'archived'
+    facet = db.Column(db.String(20), primary_key=True)
+    # Facet value; '' for the scalar facets and for uncategorized items,
+    # 'category/subreddit' for category_subreddit
+    value = db.Column(db.String(200), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
@@ -0,0 +1,72 @@
+"""Keyset (cursor) pagination over saved items.
+
+Pages are ordered newest first on (created_utc, id) and addressed by an
+opaque cursor naming the boundary row, so every page is an index range
+scan on (user_id, created_utc, id) no matter how deep it is.
+"""
+
+import base64
+from datetime import datetime
+
+from sqlalchemy import tuple_
+
+from .models import SavedItem
+
+
+def encode_cursor(item) -> str:
+    """Opaque cursor pointing at an item's position in the feed."""
+    raw = f"{item.created_utc.isoformat()}|{item.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str | None):
+    """Return (created_utc, id) for a cursor, or None if it is missing or malformed."""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created, item_id = raw.split("|")
+        return datetime.fromisoformat(created), int(item_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def keyset_page(query, per_page: int, after: str | None = None, before: str | None = None) -> dict:
+    """Fetch one page of a SavedItem query, newest first.
+
+    Args:
+        query: Filtered SavedItem query without ordering.
+        per_page: Number of items per page.
+        after: Cursor of the last item on the previous page (older items).
+        before: Cursor of the first item on the next page (newer items).
+
+    Returns:
+        Dict with items plus next_cursor/prev_cursor (None at either end).
+    """
+    key = tuple_(SavedItem.created_utc, SavedItem.id)
+    newest_first = (SavedItem.created_utc.desc(), SavedItem.id.desc())
+
+    before_key = decode_cursor(before)
+    after_key = decode_cursor(after)
+
+    if before_key:
+        # Walk backwards towards newer items, then restore feed order
+        rows = query.filter(key > before_key).order_by(
+            SavedItem.created_utc.asc(), SavedItem.id.asc()
+        ).limit(per_page + 1).all()
+        has_newer = len(rows) > per_page
+        items = list(reversed(rows[:per_page]))
+        has_older = True
+    else:
+        if after_key:
+            query = query.filter(key < after_key)
+        rows = query.order_by(*newest_first).limit(per_page + 1).all()
+        has_older = len(rows) > per_page
+        items = rows[:per_page]
+        has_newer = after_key is not None
+
+    return {
+        "items": items,
+        "next_cursor": encode_cursor(items[-1]) if items and has_older else None,
+        "prev_cursor": encode_cursor(items[0]) if items and has_newer else None,
+    }
@@ -0,0 +1,372 @@
+"""Token-bucket rate limiting shared across workers.
+
+Buckets live in Redis when it is reachable so every gunicorn worker and
+sync job draws from the same budget, with an in-memory store otherwise.
+The same stores meter outbound Reddit calls and inbound API requests.
+"""
+
+import math
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from functools import wraps
+
+from flask import current_app, g, jsonify, make_response
+
+from .extensions import get_redis
+
+# API route classes and their default per-key budget per window
+# (overridden by API_RATE_LIMIT_<CLASS>)
+API_ROUTE_CLASSES = {"read": 120, "mutate": 60, "sync": 6}
+
+
+class RateLimitWaitTooLong(Exception):
+    """A token would take longer than the caller is willing to wait."""
+
+    def __init__(self, wait: float):
+        self.wait = wait
+        super().__init__(f"Rate limited; next request allowed in {wait:.0f}s")
+
+
+class MemoryBucketStore:
+    """
+    Process-local bucket state.
+
+    Usage counters are per process too, so under several gunicorn workers
+    each one only sees the requests it served itself.
+    """
+
+    # Seconds between sweeps of expired usage counters
+    SWEEP_INTERVAL = 60
+
+    def __init__(self):
+        self._buckets = {}
+        self._counters = {}
+        self._next_sweep = 0.0
+        self._lock = threading.Lock()
+
+    def take(self, key: str, capacity: float, rate: float, now: float) -> tuple[float, float]:
+        """Take one token. Returns (seconds to wait, tokens left); wait 0 means granted."""
+        with self._lock:
+            tokens = self._refill(key, capacity, rate, now)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            return wait, tokens
+
+    def observe(self, key: str, remaining: float, reset: float, capacity: float, rate: float, now: float):
+        """Lower the bucket to the server-reported budget."""
+        with self._lock:
+            tokens = min(self._refill(key, capacity, rate, now), remaining)
+            if remaining < 1:
+                # Next token becomes available exactly when the window resets
+                tokens = min(tokens, 1 - reset * rate)
+            self._buckets[key] = (tokens, now)
+
+    def count(self, key: str, field: str, ttl: int):
+        """Increment a usage counter that expires ttl seconds after its last write."""
+        now = time.time()
+        with self._lock:
+            if now >= self._next_sweep:
+                self._counters = {k: v for k, v in self._counters.items() if v[1] > now}
+                self._next_sweep = now + self.SWEEP_INTERVAL
+            counter, expires = self._counters.get(key, (None, 0.0))
+            if counter is None or expires <= now:
+                counter = Counter()
+            counter[field] += 1
+            self._counters[key] = (counter, now + ttl)
+
+    def counts(self, key: str) -> dict[str, int]:
+        with self._lock:
+            counter, expires = self._counters.get(key, (None, 0.0))
+            if counter is None or expires <= time.time():
+                return {}
+            return dict(counter)
+
+    def _refill(self, key: str, capacity: float, rate: float, now: float) -> float:
+        tokens, updated = self._buckets.get(key, (capacity, now))
+        return min(capacity, tokens + max(0.0, now - updated) * rate)
+
+
+# KEYS[1] = bucket; ARGV = capacity, rate, now
+_TAKE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 60)
+return {tostring(wait), tostring(tokens)}
+"""
+
+# KEYS[1] = bucket; ARGV = remaining, reset, capacity, rate, now
+_OBSERVE_SCRIPT = """
+local remaining = tonumber(ARGV[1])
+local reset = tonumber(ARGV[2])
+local capacity = tonumber(ARGV[3])
+local rate = tonumber(ARGV[4])
+local now = tonumber(ARGV[5])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate, remaining)
+if remaining < 1 then
+    tokens = math.min(tokens, 1 - reset * rate)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate + reset) + 60)
+return 1
+"""
+
+
+class RedisBucketStore:
+    """Bucket state in Redis, updated atomically with Lua scripts."""
+
+    PREFIX = "ratelimit:"
+
+    def __init__(self, connection):
+        self.connection = connection
+        self._take = connection.register_script(_TAKE_SCRIPT)
+        self._observe = connection.register_script(_OBSERVE_SCRIPT)
+
+    def take(self, key: str, capacity: float, rate: float, now: float) -> tuple[float, float]:
+        wait, tokens = self._take(keys=[self.PREFIX + key], args=[capacity, rate, now])
+        return float(wait), float(tokens)
+
+    def observe(self, key: str, remaining: float, reset: float, capacity: float, rate: float, now: float):
+        self._observe(keys=[self.PREFIX + key], args=[remaining, reset, capacity, rate, now])
+
+    def count(self, key: str, field: str, ttl: int):
+        pipe = self.connection.pipeline()
+        pipe.hincrby(self.PREFIX + key, field, 1)
+        pipe.expire(self.PREFIX + key, ttl)
+        pipe.execute()
+
+    def counts(self, key: str) -> dict[str, int]:
+        return {
+            field.decode(): int(value)
+            for field, value in self.connection.hgetall(self.PREFIX + key).items()
+        }
+
+
+class TokenBucketLimiter:
+    """Allow `capacity` requests per `window` seconds per key, refilled smoothly."""
+
+    def __init__(self, store, capacity: float, window: float):
+        self.store = store
+        self.capacity = capacity
+        self.rate = capacity / window
+
+    def try_acquire(self, key: str) -> tuple[float, float]:
+        """Take a token if available. Returns (seconds to wait, tokens left)."""
+        return self.store.take(key, self.capacity, self.rate, time.time())
+
+    def acquire(self, key: str, sleep=time.sleep, max_wait: float | None = None) -> float:
+        """
+        Block until a token is granted and return the time spent waiting.
+
+        Background jobs may wait as long as it takes. Request handlers pass
+        max_wait so a drained budget fails fast instead of tying up a worker.
+
+        Raises:
+            RateLimitWaitTooLong: If the total wait would exceed max_wait
+        """
+        waited = 0.0
+        while True:
+            wait, _ = self.try_acquire(key)
+            if wait <= 0:
+                return waited
+            if max_wait is not None and waited + wait > max_wait:
+                raise RateLimitWaitTooLong(wait)
+            sleep(wait)
+            waited += wait
+
+    def defer(self, key: str, seconds: float):
+        """Empty the bucket so the next token is granted in `seconds` (e.g. after a 429)."""
+        self.store.observe(key, 0, seconds, self.capacity, self.rate, time.time())
+
+    def observe(self, key: str, headers):
+        """Fold Reddit's x-ratelimit-remaining/reset headers into the bucket."""
+        try:
+            remaining = float(headers["x-ratelimit-remaining"])
+            reset = float(headers.get("x-ratelimit-reset", 0))
+        except (KeyError, TypeError, ValueError):
+            return
+        self.store.observe(key, remaining, reset, self.capacity, self.rate, time.time())
+
+
+def make_bucket_store(app):
+    """Redis-backed store when Redis is reachable, in-memory otherwise."""
+    connection = get_redis(app)
+    if connection is not None:
+        return RedisBucketStore(connection)
+    return MemoryBucketStore()
+
+
+def get_reddit_limiter() -> TokenBucketLimiter:
+    """Return the app's limiter for Reddit API calls."""
+    app = current_app._get_current_object()
+    if "reddit_limiter" not in app.extensions:
+        app.extensions["reddit_limiter"] = TokenBucketLimiter(
+            make_bucket_store(app),
+            capacity=app.config.get("REDDIT_RATE_LIMIT", 100),
+            window=app.config.get("REDDIT_RATE_LIMIT_WINDOW", 60),
+        )
+    return app.extensions["reddit_limiter"]
+
+
+def reddit_limit_key(config) -> str:
+    """Reddit budgets requests per OAuth client id."""
+    return f"reddit:{config.get('REDDIT_CLIENT_ID')}"
+
+
+def _api_store(app):
+    if "api_bucket_store" not in app.extensions:
+        app.extensions["api_bucket_store"] = make_bucket_store(app)
+    return app.extensions["api_bucket_store"]
+
+
+def api_rate_limits(config) -> dict[str, int]:
+    """Per-key request budget per route class; 0 means unlimited."""
+    return {
+        name: config.get(f"API_RATE_LIMIT_{name.upper()}", default)
+        for name, default in API_ROUTE_CLASSES.items()
+    }
+
+
+def get_api_limiter(route_class: str, scope: str) -> TokenBucketLimiter | None:
+    """
+    Return the limiter for one API route class.
+
+    Args:
+        route_class: One of API_ROUTE_CLASSES
+        scope: "key" for a single API key's budget, "user" for the budget
+            shared by all of a user's keys and their browser session
+
+    Returns:
+        TokenBucketLimiter, or None if the class is unlimited (limit 0)
+    """
+    app = current_app._get_current_object()
+    limiters = app.extensions.setdefault("api_limiters", {})
+    if (route_class, scope) not in limiters:
+        capacity = api_rate_limits(app.config)[route_class]
+        if scope == "user":
+            capacity *= app.config.get("API_USER_RATE_LIMIT_FACTOR", 2)
+        limiters[(route_class, scope)] = TokenBucketLimiter(
+            _api_store(app), capacity=capacity, window=app.config.get("API_RATE_LIMIT_WINDOW", 60),
+        ) if capacity > 0 else None
+    return limiters[(route_class, scope)]
+
+
+def _usage_key(key_id: int, day: str) -> str:
+    return f"api:usage:{key_id}:{day}"
+
+
+def record_api_usage(key_id: int, route_class: str, limited: bool):
+    """Count one request (and whether it was throttled) against a key for today."""
+    store = _api_store(current_app._get_current_object())
+    key = _usage_key(key_id, datetime.utcnow().date().isoformat())
+    store.count(key, route_class, ttl=2 * 86400)
+    if limited:
+        store.count(key, "limited", ttl=2 * 86400)
+
+
+def get_api_usage(key_ids) -> dict[int, dict[str, int]]:
+    """
+    Today's (UTC) request counts per API key.
+
+    Returns:
+        Dict of key id to {route class: requests, "limited": throttled requests}
+    """
+    store = _api_store(current_app._get_current_object())
+    day = datetime.utcnow().date().isoformat()
+    usage = {}
+    for key_id in key_ids:
+        counts = store.counts(_usage_key(key_id, day))
+        usage[key_id] = {name: counts.get(name, 0) for name in (*API_ROUTE_CLASSES, "limited")}
+    return usage
+
+
+def api_usage_is_shared() -> bool:
+    """Whether usage counts cover every worker (Redis) or only this process."""
+    return isinstance(_api_store(current_app._get_current_object()), RedisBucketStore)
+
+
+def _limit_headers(limiter: TokenBucketLimiter, tokens: float, wait: float) -> dict:
+    """IETF RateLimit-* headers for the bucket that is closest to empty."""
+    window = round(limiter.capacity / limiter.rate)
+    headers = {
+        "RateLimit-Limit": str(int(limiter.capacity)),
+        "RateLimit-Remaining": str(max(0, math.floor(tokens))),
+        # Seconds until the bucket is full again
+        "RateLimit-Reset": str(math.ceil((limiter.capacity - tokens) / limiter.rate)),
+        "RateLimit-Policy": f"{int(limiter.capacity)};w={window}",
+    }
+    if wait > 0:
+        headers["Retry-After"] = str(math.ceil(wait))
+    return headers
+
+
+def rate_limited(route_class: str):
+    """
+    Meter an API route against the caller's key and user token buckets.
+
+    Must sit below api_auth_required. The key bucket is checked first so a
+    runaway key is stopped before it drains the budget its user's other
+    keys share. Denied requests get a 429 with Retry-After; every response
+    carries RateLimit-* headers for the most constrained bucket.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            user = g.get("api_user")
+            if user is None:
+                return f(*args, **kwargs)
+
+            key_id = g.get("api_key_id")
+            buckets = [("user", f"api:user:{user.id}:{route_class}")]
+            if key_id:
+                buckets.insert(0, ("key", f"api:key:{key_id}:{route_class}"))
+
+            tightest = None
+            for scope, bucket in buckets:
+                limiter = get_api_limiter(route_class, scope)
+                if limiter is None:
+                    continue
+                wait, tokens = limiter.try_acquire(bucket)
+                if tightest is None or wait > 0 or tokens < tightest[1]:
+                    tightest = (limiter, tokens, wait)
+                if wait > 0:
+                    break
+
+            limited = tightest is not None and tightest[2] > 0
+            if key_id:
+                record_api_usage(key_id, route_class, limited)
+
+            if limited:
+                response = jsonify({
+                    "error": "Rate limit exceeded",
+                    "retry_after": math.ceil(tightest[2]),
+                })
+                response.status_code = 429
+            else:
+                response = make_response(f(*args, **kwargs))
+            if tightest is not None:
+                response.headers.update(_limit_headers(*tightest))
+            return response
+
+        return decorated
+    return decorator
@@ -0,0 +1,93 @@
+"""Scheduled sync of every user's saved items.
+
+Exposed as `flask sync-all`; pass --daemon to keep running on an interval
+instead of a cron job that loops over users one at a time.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+
+from .extensions import db
+from .models import User
+from .sync import recover_stale_syncs, sync_user_items
+
+
+def stale_user_ids(min_age: timedelta = None) -> list[int]:
+    """User ids ordered by staleness, never-synced users first."""
+    query = db.session.query(User.id).filter(User.refresh_token.isnot(None))
+    if min_age:
+        cutoff = datetime.utcnow() - min_age
+        query = query.filter(db.or_(User.last_sync_at.is_(None), User.last_sync_at < cutoff))
+    return [user_id for (user_id,) in query.order_by(User.last_sync_at.asc().nulls_first(), User.id)]
+
+
+def sync_all_users(app, max_workers: int = 2, full_sync: bool = False, min_age: timedelta = None,
+                   mode: str = "saved", force_prune: bool = False) -> dict:
+    """
+    Sync every user, stalest first, with a bounded worker pool.
+
+    Each sync claims the user atomically, so users already being synced by
+    a request or another scheduler are skipped. Reddit requests from all
+    workers draw from the shared rate limiter.
+
+    Returns:
+        Dict mapping user id to that user's sync result
+    """
+    with app.app_context():
+        recovered = recover_stale_syncs()
+        if recovered:
+            app.logger.warning("Released %d stale sync claims", recovered)
+        user_ids = stale_user_ids(min_age)
+
+    def run(user_id):
+        with app.app_context():
+            return sync_user_items(user_id, full_sync, mode, force_prune=force_prune)
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="sync-all") as executor:
+        return dict(zip(user_ids, executor.map(run, user_ids)))
+
+
+@click.command("sync-all")
+@click.option("--full", is_flag=True, help="Full sync instead of incremental.")
+@click.option("--workers", type=int, default=None, help="Concurrent user syncs (default: SCHEDULER_WORKERS).")
+@click.option("--min-age", type=int, default=0, help="Skip users synced within this many minutes.")
+@click.option("--metadata", is_flag=True, help="Only refresh scores and comment counts via /api/info.")
+@click.option("--force-prune", is_flag=True,
+              help="With --full, prune unsaved items even past SYNC_PRUNE_MAX_FRACTION.")
+@click.option("--daemon", is_flag=True, help="Keep running, syncing every --interval seconds.")
+@click.option("--interval", type=int, default=None, help="Seconds between passes (default: SCHEDULER_INTERVAL).")
+def sync_all_command(full, workers, min_age, metadata, force_prune, daemon, interval):
+    """Sync saved items for all users."""
+    if force_prune and (not full or metadata or daemon):
+        raise click.UsageError("--force-prune needs --full and cannot be used with --metadata or --daemon")
+    app = current_app._get_current_object()
+    workers = workers or app.config.get("SCHEDULER_WORKERS", 2)
+    interval = interval or app.config.get("SCHEDULER_INTERVAL", 900)
+
+    while True:
+        started = time.monotonic()
+        results = sync_all_users(
+            app, workers, full,
+            min_age=timedelta(minutes=min_age) if min_age else None,
+            mode="metadata" if metadata else "saved",
+            force_prune=force_prune,
+        )
+
+        failed = 0
+        for user_id, result in results.items():
+            if "error" in result:
+                failed += 1
+                click.echo(f"user {user_id}: {result['error']}")
+            elif metadata:
+                click.echo(f"user {user_id}: {result['refreshed_items']} refreshed")
+            else:
+                click.echo(f"user {user_id}: {result['new_items']} new, {result['updated_items']} updated")
+        click.echo(f"Synced {len(results) - failed}/{len(results)} users in {time.monotonic() - started:.1f}s")
+
+        if not daemon:
+            return
+        time.sleep(interval)
@@ -0,0 +1,271 @@
+"""Full-text search over saved items.
+
+The backend is picked from the database dialect: SQLite uses an FTS5 index
+kept in sync by triggers, PostgreSQL a generated tsvector column plus
+pg_trgm indexes, and anything else falls back to ILIKE scans. Every
+backend exposes the same apply()/snippets() interface to the views.
+"""
+
+import re
+
+import click
+from flask import current_app
+from markupsafe import Markup, escape
+from sqlalchemy import bindparam, false, func, literal_column, text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from sqlalchemy.sql import column, table
+
+from .extensions import db
+from .models import SavedItem
+
+# Control characters that cannot occur in stored text, used to mark
+# highlights before the snippet is HTML-escaped
+_MARK_START = "\x02"
+_MARK_END = "\x03"
+
+
+def _highlight(snippet: str) -> Markup:
+    """Escape a snippet and turn the match markers into <mark> tags."""
+    html = str(escape(snippet))
+    return Markup(html.replace(_MARK_START, "<mark>").replace(_MARK_END, "</mark>"))
+
+
+def _terms(text_query: str) -> list[str]:
+    return re.findall(r"\w+", text_query.lower())
+
+
+def _like_pattern(text_query: str) -> str:
+    """Substring LIKE pattern that treats %, _ and \\ in the query literally."""
+    escaped = re.sub(r"([\\%_])", r"\\\1", text_query)
+    return f"%{escaped}%"
+
+
+class LikeSearchBackend:
+    """Substring search with ILIKE. Works everywhere but scans every row."""
+
+    name = "like"
+
+    def setup(self):
+        pass
+
+    def rebuild(self):
+        pass
+
+    def apply(self, query, text_query: str, ranked: bool = True):
+        """Restrict a SavedItem query to matches, newest first."""
+        pattern = _like_pattern(text_query)
+        query = query.filter(
+            db.or_(
+                SavedItem.title.ilike(pattern, escape="\\"),
+                SavedItem.body.ilike(pattern, escape="\\"),
+                SavedItem.selftext.ilike(pattern, escape="\\"),
+                SavedItem.subreddit.ilike(pattern, escape="\\"),
+            )
+        )
+        return query.order_by(SavedItem.created_utc.desc()) if ranked else query
+
+    def snippets(self, item_ids: list[int], text_query: str) -> dict[int, Markup]:
+        return {}
+
+
+class SqliteSearchBackend:
+    """SQLite FTS5 index with BM25 ranking, prefix matching and snippets."""
+
+    name = "fts5"
+    TABLE = "saved_items_fts"
+    COLUMNS = ("title", "body", "selftext", "subreddit")
+    # bm25() column weights: title matches count most, subreddit least
+    WEIGHTS = (10.0, 2.0, 2.0, 1.0)
+
+    def setup(self):
+        """Create the FTS table and its sync triggers if missing."""
+        columns = ", ".join(self.COLUMNS)
+        new_values = ", ".join(f"new.{c}" for c in self.COLUMNS)
+        old_values = ", ".join(f"old.{c}" for c in self.COLUMNS)
+
+        existed = db.session.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {"name": self.TABLE},
+        ).first() is not None
+
+        statements = [
+            f"""CREATE VIRTUAL TABLE IF NOT EXISTS {self.TABLE} USING fts5(
+                {columns},
+                content='saved_items', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+            )""",
+            f"""CREATE TRIGGER IF NOT EXISTS {self.TABLE}_ai AFTER INSERT ON saved_items BEGIN
+                INSERT INTO {self.TABLE}(rowid, {columns}) VALUES (new.id, {new_values});
+            END""",
+            f"""CREATE TRIGGER IF NOT EXISTS {self.TABLE}_ad AFTER DELETE ON saved_items BEGIN
+                INSERT INTO {self.TABLE}({self.TABLE}, rowid, {columns}) VALUES ('delete', old.id, {old_values});
+            END""",
+            f"""CREATE TRIGGER IF NOT EXISTS {self.TABLE}_au AFTER UPDATE OF {columns} ON saved_items BEGIN
+                INSERT INTO {self.TABLE}({self.TABLE}, rowid, {columns}) VALUES ('delete', old.id, {old_values});
+                INSERT INTO {self.TABLE}(rowid, {columns}) VALUES (new.id, {new_values});
+            END""",
+        ]
+        for statement in statements:
+            db.session.execute(text(statement))
+        db.session.commit()
+
+        # Index rows written before the FTS table existed
+        if not existed:
+            self.rebuild()
+
+    def rebuild(self):
+        """Rebuild the index from the saved_items table."""
+        db.session.execute(text(f"INSERT INTO {self.TABLE}({self.TABLE}) VALUES ('rebuild')"))
+        db.session.commit()
+
+    def _match_expression(self, text_query: str) -> str | None:
+        """Quote each term and prefix-match it; terms are ANDed."""
+        terms = _terms(text_query)
+        if not terms:
+            return None
+        return " ".join(f'"{term}"*' for term in terms)
+
+    def apply(self, query, text_query: str, ranked: bool = True):
+        """Restrict a SavedItem query to matches, best BM25 rank first."""
+        match = self._match_expression(text_query)
+        if match is None:
+            return query.filter(false())
+
+        fts = table(self.TABLE, column("rowid"))
+        fts_column = literal_column(self.TABLE)
+        query = query.join(fts, fts.c.rowid == SavedItem.id).filter(fts_column.op("MATCH")(match))
+        if ranked:
+            query = query.order_by(func.bm25(fts_column, *self.WEIGHTS), SavedItem.created_utc.desc())
+        return query
+
+    def snippets(self, item_ids: list[int], text_query: str) -> dict[int, Markup]:
+        """Highlighted excerpts for the given matching items."""
+        match = self._match_expression(text_query)
+        if match is None or not item_ids:
+            return {}
+
+        stmt = text(
+            f"SELECT rowid, snippet({self.TABLE}, -1, :start, :end, '…', 16) FROM {self.TABLE} "
+            f"WHERE {self.TABLE} MATCH :match AND rowid IN :ids"
+        ).bindparams(bindparam("ids", expanding=True))
+        rows = db.session.execute(
+            stmt, {"start": _MARK_START, "end": _MARK_END, "match": match, "ids": list(item_ids)}
+        )
+        return {rowid: _highlight(snippet) for rowid, snippet in rows if snippet}
+
+
+class PostgresSearchBackend:
+    """Ranked tsvector search with pg_trgm substring and typo-tolerant matching."""
+
+    name = "postgres"
+    # Must match the trigram index expression exactly for the planner to use it
+    SEARCH_TEXT = (
+        "(coalesce(title, '') || ' ' || coalesce(body, '') || ' ' || "
+        "coalesce(selftext, '') || ' ' || coalesce(subreddit, ''))"
+    )
+    # Word similarity above which a title counts as a fuzzy match
+    # (pg_trgm.word_similarity_threshold for the indexable %> operator)
+    SIMILARITY_THRESHOLD = 0.5
+
+    def setup(self):
+        """Add the generated tsvector column and the GIN indexes if missing."""
+        statements = [
+            "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+            """ALTER TABLE saved_items ADD COLUMN IF NOT EXISTS search_vector tsvector
+                GENERATED ALWAYS AS (
+                    setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+                    setweight(to_tsvector('english', coalesce(selftext, '') || ' ' || coalesce(body, '')), 'B') ||
+                    setweight(to_tsvector('simple', coalesce(subreddit, '')), 'C')
+                ) STORED""",
+            "CREATE INDEX IF NOT EXISTS ix_saved_items_search_vector ON saved_items USING GIN (search_vector)",
+            f"CREATE INDEX IF NOT EXISTS ix_saved_items_search_trgm ON saved_items "
+            f"USING GIN ({self.SEARCH_TEXT} gin_trgm_ops)",
+            "CREATE INDEX IF NOT EXISTS ix_saved_items_title_trgm ON saved_items "
+            "USING GIN (coalesce(title, '') gin_trgm_ops)",
+        ]
+        for statement in statements:
+            db.session.execute(text(statement))
+        db.session.commit()
+
+    def rebuild(self):
+        """The tsvector is generated by Postgres; only the indexes can be rebuilt."""
+        for index in ("ix_saved_items_search_vector", "ix_saved_items_search_trgm", "ix_saved_items_title_trgm"):
+            db.session.execute(text(f"REINDEX INDEX {index}"))
+        db.session.commit()
+
+    def _tsquery(self, text_query: str):
+        terms = _terms(text_query)
+        if not terms:
+            return None
+        return func.to_tsquery("english", " & ".join(f"{term}:*" for term in terms))
+
+    def apply(self, query, text_query: str, ranked: bool = True):
+        """Restrict a SavedItem query to matches, best rank first.
+
+        An item matches on the tsvector (stemmed, prefix), on a substring
+        of any text field, or on a close word similarity to the title.
+        """
+        tsquery = self._tsquery(text_query)
+        if tsquery is None:
+            return query.filter(false())
+
+        # Every branch must be index-backed or the OR forces a sequential
+        # scan, so the fuzzy title match uses %> (which reads the threshold
+        # from a setting) rather than comparing word_similarity() itself.
+        # The setting is transaction-local, like the query that uses it.
+        db.session.execute(
+            text("SELECT set_config('pg_trgm.word_similarity_threshold', :threshold, true)"),
+            {"threshold": str(self.SIMILARITY_THRESHOLD)},
+        )
+        vector = literal_column("saved_items.search_vector")
+        title = func.coalesce(SavedItem.title, "")
+        query = query.filter(db.or_(
+            vector.op("@@")(tsquery),
+            literal_column(self.SEARCH_TEXT).ilike(_like_pattern(text_query), escape="\\"),
+            title.op("%>")(text_query),
+        ))
+        if ranked:
+            rank = func.ts_rank(vector, tsquery) + func.word_similarity(text_query, title)
+            query = query.order_by(rank.desc(), SavedItem.created_utc.desc())
+        return query
+
+    def snippets(self, item_ids: list[int], text_query: str) -> dict[int, Markup]:
+        """Highlighted excerpts from ts_headline for the given items."""
+        tsquery = self._tsquery(text_query)
+        if tsquery is None or not item_ids:
+            return {}
+
+        document = func.concat_ws(" … ", SavedItem.title, SavedItem.selftext, SavedItem.body)
+        options = f"StartSel={_MARK_START}, StopSel={_MARK_END}, MaxWords=30, MinWords=12, MaxFragments=1"
+        rows = db.session.query(
+            SavedItem.id, func.ts_headline("english", document, tsquery, options)
+        ).filter(SavedItem.id.in_(item_ids))
+        return {item_id: _highlight(snippet) for item_id, snippet in rows if _MARK_START in (snippet or "")}
+
+
+def init_search(app):
+    """Pick and prepare the search backend for the app's database."""
+    backends = {"sqlite": SqliteSearchBackend, "postgresql": PostgresSearchBackend}
+    backend = LikeSearchBackend()
+    backend_class = backends.get(db.engine.dialect.name)
+    if backend_class is not None:
+        try:
+            backend_class().setup()
+            backend = backend_class()
+        except (OperationalError, ProgrammingError) as e:
+            db.session.rollback()
+            app.logger.warning("%s search unavailable, falling back to LIKE search: %s", backend_class.name, e)
+    app.extensions["search_backend"] = backend
+
+
+def get_search_backend():
+    """Return the app's search backend."""
+    return current_app.extensions["search_backend"]
+
+
+@click.command("rebuild-search")
+def rebuild_search_command():
+    """Rebuild the full-text search index from saved_items."""
+    backend = get_search_backend()
+    backend.rebuild()
+    click.echo(f"Rebuilt {backend.name} search index")
@@ -1,12 +1,21 @@
 """Reddit saved items sync service."""
 
-import time
-import requests
-from datetime import datetime
+import queue
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from datetime import datetime, timedelta
+import click
 from flask import current_app
+from sqlalchemy import delete, func, or_, update
 from .extensions import db
-from .models import User, SavedItem
-from .categories import categorize_subreddit
+from .models import User, SavedItem, make_preview
+from .cache import bump_data_version
+from .categories import categorize_many
+from .facets import FACET_COLUMNS, apply_facet_deltas, facet_deltas, rebuild_facets
+from .ratelimit import RateLimitWaitTooLong, get_reddit_limiter, reddit_limit_key
+from .transport import get_transport
 
 
 class RedditAPIError(Exception):
@@ -18,44 +27,48 @@ class RedditSyncService:
     """Service for syncing saved items from Reddit."""
 
     BASE_URL = "https://oauth.reddit.com"
-
-    def __init__(self, user: User, config: dict):
+    # Consecutive already-known items after which an incremental sync stops
+    KNOWN_RUN_LIMIT = 25
+    # Reddit listings return at most this many items
+    LISTING_LIMIT = 1000
+    # Maximum fullnames per /api/info request
+    INFO_BATCH_SIZE = 100
+    # Seconds to wait for the prefetch thread to notice it was stopped
+    PREFETCH_JOIN_TIMEOUT = 5.0
+
+    def __init__(self, user: User, config: dict, limit_wait: float | None = None):
         self.user = user
         self.config = config
         self.headers = {
             "Authorization": f"Bearer {user.access_token}",
             "User-Agent": config.get("REDDIT_USER_AGENT", "RedditSavedViewer/1.0"),
         }
-        self.rate_limit_remaining = 60
-        self.rate_limit_reset = 0
-
-    def _check_rate_limit(self, response):
-        """Update rate limit tracking from response headers."""
-        self.rate_limit_remaining = int(float(response.headers.get("x-ratelimit-remaining", 60)))
-        self.rate_limit_reset = float(response.headers.get("x-ratelimit-reset", 0))
-
-        if self.rate_limit_remaining < 5:
-            sleep_time = max(self.rate_limit_reset, 1)
-            time.sleep(sleep_time)
-
-    def _make_request(self, endpoint: str, params: dict = None, method: str = "GET", data: dict = None) -> dict:
-        """Make rate-limited request to Reddit API."""
+        self.transport = get_transport(config)
+        self.limiter = get_reddit_limiter()
+        self.limit_key = reddit_limit_key(config)
+        # Longest wait for a rate-limit token; None blocks (background syncs)
+        self.limit_wait = limit_wait
+        # Whether the last listing crawl reached its final page
+        self.listing_complete = False
+
+    def _make_request(self, endpoint: str, params: dict = None, method: str = "GET", data: dict = None,
+                      idempotent: bool | None = None) -> dict:
+        """Make rate-limited request to Reddit API (see RedditTransport.request for retries)."""
         url = f"{self.BASE_URL}{endpoint}"
 
-        if method == "POST":
-            response = requests.post(url, headers=self.headers, data=data, timeout=30)
-        else:
-            response = requests.get(url, headers=self.headers, params=params, timeout=30)
-
-        self._check_rate_limit(response)
+        response = self.transport.request(
+            method, url,
+            limiter=self.limiter, limit_key=self.limit_key, idempotent=idempotent,
+            limit_wait=self.limit_wait,
+            headers=self.headers, params=params, data=data,
+        )
 
         if response.status_code == 401:
             raise RedditAPIError("Token expired")
         elif response.status_code == 403:
             raise RedditAPIError("Insufficient permissions. Please log out and log back in to re-authorize.")
         elif response.status_code == 429:
-            time.sleep(60)
-            return self._make_request(endpoint, params, method, data)
+            raise RedditAPIError("Rate limited by Reddit. Please try again later.")
         elif response.status_code not in (200, 202):
             raise RedditAPIError(f"API error: {response.status_code}")
 
@@ -64,105 +77,342 @@ class RedditSyncService:
             return response.json()
         return {}
 
-    def sync_saved_items(self, full_sync: bool = False) -> tuple[int, int]:
+    def sync_saved_items(self, full_sync: bool = False, pipelined: bool | None = None,
+                         force_prune: bool = False) -> dict:
         """
         Sync saved items from Reddit.
 
+        The saved listing is ordered newest-saved first, so an incremental
+        sync stops on the page that contains the user's high-water mark (the
+        newest fullname seen by the previous sync) or after a run of
+        already-known items, whichever comes first.
+
+        A pipelined sync fetches the next listing page on a background thread
+        while the current one is written to the database.
+
+        A full sync that walks the whole listing to its last page also
+        deletes local items that are no longer saved on Reddit (see
+        _prune_unsaved).
+
         Args:
-            full_sync: If True, fetch all items. If False, stop at first known item.
+            full_sync: If True, fetch all items. If False, stop at first known items.
+            pipelined: Prefetch pages while persisting. Defaults to the
+                SYNC_PIPELINE setting for full syncs; incremental syncs usually
+                stop after a page or two, so they fetch sequentially.
+            force_prune: Prune even if more than SYNC_PRUNE_MAX_FRACTION of
+                the local items went missing (the crawl must still be complete)
 
         Returns:
-            Tuple of (new_count, updated_count)
+            Dict with new_items, updated_items, pruned_items and pages_fetched
         """
+        if pipelined is None:
+            pipelined = full_sync and self.config.get("SYNC_PIPELINE", True)
+
         new_count = 0
         updated_count = 0
+        known_run = 0
+        newest_fullname = None
+        high_water_mark = self.user.sync_high_water_mark
+        known_run_limit = self.config.get("SYNC_KNOWN_RUN_LIMIT", self.KNOWN_RUN_LIMIT)
+        seen_ids = set()
+        self.pages_fetched = 0
+
+        # Resolved here: the prefetch thread must not touch ORM objects
+        listing = f"/user/{self.user.username}/saved"
+        pages = self._prefetch_pages(listing) if pipelined else self._iter_pages(listing)
+        with closing(pages):
+            for items in pages:
+                if newest_fullname is None:
+                    newest_fullname = items[0]["data"]["name"]
+
+                page_new, page_updated, known_ids = self._save_page(items, full_sync)
+                new_count += page_new
+                updated_count += page_updated
+                seen_ids.update(item_data["data"]["id"] for item_data in items)
+
+                if not full_sync:
+                    reached_known = False
+                    for item_data in items:
+                        if item_data["data"]["name"] == high_water_mark:
+                            reached_known = True
+                        known_run = known_run + 1 if item_data["data"]["id"] in known_ids else 0
+                        if known_run >= known_run_limit:
+                            reached_known = True
+                    if reached_known:
+                        break
+
+        pruned_count = 0
+        if full_sync and self.listing_complete and self.config.get("SYNC_PRUNE_UNSAVED", True):
+            pruned_count = self._prune_unsaved(seen_ids, force_prune)
+
+        if newest_fullname:
+            self.user.sync_high_water_mark = newest_fullname
+        self.user.last_sync_at = datetime.utcnow()
+        self.user.sync_in_progress = False
+        self.user.sync_lease_expires_at = None
+        db.session.commit()
+
+        return {
+            "new_items": new_count,
+            "updated_items": updated_count,
+            "pruned_items": pruned_count,
+            "pages_fetched": self.pages_fetched,
+        }
+
+    def _prune_unsaved(self, seen_ids: set[str], force: bool = False) -> int:
+        """
+        Delete local items that a complete crawl of the listing did not return.
+
+        Reddit stops serving a listing after LISTING_LIMIT items, so when the
+        crawl reached that many the older saves are simply invisible rather
+        than unsaved, and nothing is pruned. Deleting also takes the items'
+        notes and reviewed/archived state, so an empty crawl, or one that
+        would remove more than SYNC_PRUNE_MAX_FRACTION of the local items,
+        is treated as a bad listing response and prunes nothing. Pass force
+        to lift the fraction cap after a genuine mass unsave.
+
+        Returns:
+            Number of items deleted
+        """
+        if not seen_ids or len(seen_ids) >= self.LISTING_LIMIT:
+            return 0
+
+        local_ids = {
+            reddit_id for (reddit_id,) in
+            db.session.query(SavedItem.reddit_id).filter(SavedItem.user_id == self.user.id)
+        }
+        missing = sorted(local_ids - seen_ids)
+        max_fraction = self.config.get("SYNC_PRUNE_MAX_FRACTION", 0.1)
+        if not force and len(missing) > max_fraction * len(local_ids):
+            current_app.logger.warning(
+                "Not pruning %d of %d items for user %s: more than %.0f%% missing from the listing "
+                "(run a full sync with force_prune to prune anyway)",
+                len(missing), len(local_ids), self.user.id, max_fraction * 100,
+            )
+            return 0
+
+        # Chunked to stay under the database's bound-parameter limit
+        for start in range(0, len(missing), 500):
+            where = (
+                SavedItem.user_id == self.user.id,
+                SavedItem.reddit_id.in_(missing[start:start + 500]),
+            )
+            removed = db.session.query(*FACET_COLUMNS).filter(*where).all()
+            apply_facet_deltas(self.user.id, facet_deltas(removed, sign=-1))
+            db.session.execute(delete(SavedItem).where(*where))
+        if missing:
+            bump_data_version(self.user.id)
+        db.session.commit()
+        return len(missing)
+
+    def refresh_metadata(self, since: datetime = None) -> dict:
+        """
+        Refresh score and num_comments of stored items without crawling.
+
+        Local fullnames are looked up through /api/info in chunks of
+        INFO_BATCH_SIZE, fetched concurrently (SYNC_REFRESH_WORKERS) under the
+        shared rate limiter, and written back in one bulk UPDATE.
+
+        Args:
+            since: Only refresh items created at or after this time
+
+        Returns:
+            Dict with refreshed_items and requests
+        """
+        query = db.session.query(SavedItem.id, SavedItem.reddit_fullname).filter(
+            SavedItem.user_id == self.user.id
+        )
+        if since:
+            query = query.filter(SavedItem.created_utc >= since)
+        ids_by_fullname = {fullname: item_id for item_id, fullname in query}
+
+        fullnames = list(ids_by_fullname)
+        chunks = [fullnames[i:i + self.INFO_BATCH_SIZE] for i in range(0, len(fullnames), self.INFO_BATCH_SIZE)]
+
+        def fetch(chunk):
+            return self._make_request("/api/info", {"id": ",".join(chunk)})
+
+        updates = []
+        now = datetime.utcnow()
+        with ThreadPoolExecutor(max_workers=self.config.get("SYNC_REFRESH_WORKERS", 4)) as executor:
+            for data in executor.map(fetch, chunks):
+                for child in data.get("data", {}).get("children", []):
+                    item = child["data"]
+                    item_id = ids_by_fullname.get(item.get("name"))
+                    if item_id is None:
+                        continue
+                    nc = item.get("num_comments")
+                    updates.append({
+                        "id": item_id,
+                        "score": int(float(item.get("score", 0) or 0)),
+                        "num_comments": int(float(nc)) if nc is not None else None,
+                        "synced_at": now,
+                    })
+
+        if updates:
+            db.session.execute(update(SavedItem), updates)
+            bump_data_version(self.user.id)
+        db.session.commit()
+
+        return {"refreshed_items": len(updates), "requests": len(chunks)}
+
+    def _iter_pages(self, listing: str, stop: threading.Event = None):
+        """
+        Yield the children of each saved listing page along the after cursor.
+
+        Sets listing_complete once a non-empty page reports no next page, so
+        an empty or truncated response is never mistaken for the full listing.
+        """
+        self.listing_complete = False
         after = None
 
-        while True:
+        while stop is None or not stop.is_set():
             params = {"limit": 100}
             if after:
                 params["after"] = after
 
-            data = self._make_request(f"/user/{self.user.username}/saved", params)
+            data = self._make_request(listing, params)
+            self.pages_fetched += 1
 
             items = data.get("data", {}).get("children", [])
-
             if not items:
-                break
+                return
+            yield items
 
-            for item_data in items:
-                kind = item_data["kind"]  # t3 = post, t1 = comment
-                item = item_data["data"]
+            after = data.get("data", {}).get("after")
+            if not after:
+                self.listing_complete = True
+                return
 
-                existing = SavedItem.query.filter_by(
-                    user_id=self.user.id,
-                    reddit_id=item["id"]
-                ).first()
+    def _prefetch_pages(self, listing: str):
+        """
+        Yield listing pages fetched ahead by a producer thread.
 
-                if existing:
-                    if not full_sync:
-                        continue
-                    self._update_item(existing, item, kind)
-                    updated_count += 1
-                else:
-                    self._create_item(item, kind)
-                    new_count += 1
+        The bounded queue (SYNC_PREFETCH_PAGES) caps how many unpersisted
+        pages are held in memory. Closing the generator stops the producer;
+        one still blocked on a rate-limit token or an HTTP read is waited
+        for at most PREFETCH_JOIN_TIMEOUT seconds and then left to finish on
+        its own (it is a daemon and discards whatever it fetches).
+        """
+        pages = queue.Queue(maxsize=self.config.get("SYNC_PREFETCH_PAGES", 2))
+        stop = threading.Event()
+
+        def put(message):
+            while not stop.is_set():
+                try:
+                    pages.put(message, timeout=0.1)
+                    return
+                except queue.Full:
+                    continue
+
+        def produce():
+            try:
+                for items in self._iter_pages(listing, stop):
+                    put(("page", items))
+            except Exception as e:
+                put(("error", e))
+            else:
+                put(("done", None))
+
+        producer = threading.Thread(target=produce, name="sync-prefetch", daemon=True)
+        producer.start()
+        try:
+            while True:
+                kind, payload = pages.get()
+                if kind == "error":
+                    raise payload
+                if kind == "done":
+                    return
+                yield payload
+        finally:
+            stop.set()
+            producer.join(self.PREFETCH_JOIN_TIMEOUT)
+            if producer.is_alive():
+                current_app.logger.warning(
+                    "Prefetch thread still busy after %.0fs; not waiting for it",
+                    self.PREFETCH_JOIN_TIMEOUT,
+                )
+
+    def _save_page(self, items: list[dict], full_sync: bool) -> tuple[int, int, set[str]]:
+        """
+        Persist one listing page with a single lookup and a single upsert.
 
-            after = data.get("data", {}).get("after")
-            if not after:
-                break
+        Existing rows are only touched on a full sync; new rows are always
+        inserted. The page is committed once.
 
-            time.sleep(0.5)
+        Returns:
+            Tuple of (new_count, updated_count, known reddit_ids) for the page
+        """
+        rows = {}
+        for item_data in items:
+            row = self._item_to_row(item_data["data"], item_data["kind"])
+            rows[row["reddit_id"]] = row
+        categories = categorize_many(row["subreddit"] for row in rows.values())
+        for row, category in zip(rows.values(), categories):
+            row["category"] = category
+
+        existing_ids = {
+            reddit_id for (reddit_id,) in db.session.query(SavedItem.reddit_id).filter(
+                SavedItem.user_id == self.user.id,
+                SavedItem.reddit_id.in_(list(rows)),
+            )
+        }
 
-        self.user.last_sync_at = datetime.utcnow()
-        self.user.sync_in_progress = False
+        if not full_sync:
+            rows = {rid: row for rid, row in rows.items() if rid not in existing_ids}
+
+        if rows:
+            upsert_saved_items(list(rows.values()))
+            # Upserts never change facet columns, so only new rows count
+            apply_facet_deltas(self.user.id, facet_deltas(
+                row for rid, row in rows.items() if rid not in existing_ids
+            ))
+            bump_data_version(self.user.id)
+        renew_sync_lease(self.user.id)
         db.session.commit()
 
-        return new_count, updated_count
+        updated_count = len(existing_ids) if full_sync else 0
+        return len(rows) - updated_count, updated_count, existing_ids
 
-    def _create_item(self, item: dict, kind: str):
-        """Create a new SavedItem from Reddit data."""
+    def _item_to_row(self, item: dict, kind: str) -> dict:
+        """Convert Reddit listing data into a saved_items row."""
         is_post = kind == "t3"
 
-        saved_item = SavedItem(
-            user_id=self.user.id,
-            reddit_id=item["id"],
-            reddit_fullname=item["name"],
-            item_type="post" if is_post else "comment",
-            subreddit=item["subreddit"],
-            author=item.get("author", "[deleted]"),
-            permalink=f"https://reddit.com{item['permalink']}",
-            score=int(float(item.get("score", 0) or 0)),
-            created_utc=datetime.utcfromtimestamp(item["created_utc"]),
-            category=categorize_subreddit(item["subreddit"]),
-        )
+        row = {
+            "user_id": self.user.id,
+            "reddit_id": item["id"],
+            "reddit_fullname": item["name"],
+            "item_type": "post" if is_post else "comment",
+            "subreddit": item["subreddit"],
+            "author": item.get("author", "[deleted]"),
+            "permalink": f"https://reddit.com{item['permalink']}",
+            "score": int(float(item.get("score", 0) or 0)),
+            "created_utc": datetime.utcfromtimestamp(item["created_utc"]),
+            "category": None,  # filled in per page by _save_page
+            "synced_at": datetime.utcnow(),
+            "title": None,
+            "url": None,
+            "selftext": None,
+            "is_self": None,
+            "num_comments": None,
+            "body": None,
+            "post_title": None,
+        }
 
         if is_post:
-            saved_item.title = item.get("title")
-            saved_item.url = item.get("url")
+            row["title"] = item.get("title")
+            row["url"] = item.get("url")
             selftext = item.get("selftext") or ""
-            saved_item.selftext = selftext[:2000] if selftext else None
-            saved_item.is_self = item.get("is_self")
-            saved_item.num_comments = int(float(item.get("num_comments") or 0)) if item.get("num_comments") is not None else None
+            row["selftext"] = selftext[:2000] if selftext else None
+            row["is_self"] = item.get("is_self")
+            row["num_comments"] = int(float(item.get("num_comments") or 0)) if item.get("num_comments") is not None else None
         else:
             body = item.get("body") or ""
-            saved_item.body = body[:2000] if body else None
-            saved_item.post_title = item.get("link_title")
-
-        db.session.add(saved_item)
-        db.session.commit()
+            row["body"] = body[:2000] if body else None
+            row["post_title"] = item.get("link_title")
 
-    def _update_item(self, existing: SavedItem, item: dict, kind: str):
-        """Update an existing SavedItem."""
-        existing.score = int(float(item.get("score", existing.score) or 0))
-        existing.synced_at = datetime.utcnow()
-
-        if kind == "t3":
-            nc = item.get("num_comments")
-            if nc is not None:
-                existing.num_comments = int(float(nc))
-
-        db.session.commit()
+        row["preview"] = make_preview(row["item_type"], row["is_self"], row["selftext"], row["body"], row["url"])
+        return row
 
     def unsave_item(self, fullname: str) -> bool:
         """
@@ -174,17 +424,171 @@ class RedditSyncService:
         Returns:
             True if successful
         """
-        self._make_request("/api/unsave", method="POST", data={"id": fullname})
+        self._make_request("/api/unsave", method="POST", data={"id": fullname}, idempotent=True)
         return True
 
 
-def sync_user_items(user_id: int, full_sync: bool = False) -> dict:
+def upsert_saved_items(rows: list[dict]):
+    """
+    Insert or refresh saved_items rows in one statement.
+
+    Uses the dialect's native INSERT ... ON CONFLICT against the
+    uq_user_reddit_item constraint. On conflict only the fields a resync
+    refreshes (score, num_comments, synced_at) are overwritten, so user
+    state such as reviewed/notes is never clobbered. Does not commit.
+
+    Args:
+        rows: Column dicts as produced by RedditSyncService._item_to_row
+    """
+    if not rows:
+        return
+
+    dialect = db.session.get_bind().dialect.name
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+        stmt = insert(SavedItem).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id", "reddit_id"],
+            set_=_upsert_updates(stmt),
+        )
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(SavedItem).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            constraint="uq_user_reddit_item",
+            set_=_upsert_updates(stmt),
+        )
+    else:
+        # No portable upsert: fall back to one lookup plus ORM writes
+        existing = {
+            item.reddit_id: item for item in SavedItem.query.filter(
+                SavedItem.user_id == rows[0]["user_id"],
+                SavedItem.reddit_id.in_([row["reddit_id"] for row in rows]),
+            )
+        }
+        for row in rows:
+            item = existing.get(row["reddit_id"])
+            if item is None:
+                db.session.add(SavedItem(**row))
+                continue
+            item.score = row["score"]
+            item.synced_at = row["synced_at"]
+            if row["num_comments"] is not None:
+                item.num_comments = row["num_comments"]
+        return
+
+    db.session.execute(stmt)
+
+
+def _upsert_updates(stmt) -> dict:
+    """Columns refreshed when an upserted row already exists."""
+    return {
+        "score": stmt.excluded.score,
+        "num_comments": func.coalesce(stmt.excluded.num_comments, SavedItem.num_comments),
+        "synced_at": stmt.excluded.synced_at,
+    }
+
+
+def _lease_expiry() -> datetime:
+    seconds = current_app.config.get("SYNC_LEASE_SECONDS", 600)
+    return datetime.utcnow() + timedelta(seconds=seconds)
+
+
+def _claim_is_stale():
+    """SQL condition for a claim whose holder stopped renewing it."""
+    return or_(User.sync_lease_expires_at.is_(None), User.sync_lease_expires_at < datetime.utcnow())
+
+
+def claim_sync(user_id: int) -> bool:
+    """
+    Mark a user's sync as in progress if no live sync holds it.
+
+    The check and the write are one conditional UPDATE, so concurrent
+    workers cannot both claim the same user. The claim carries a lease
+    (SYNC_LEASE_SECONDS) that the running sync renews after every page; an
+    expired lease means its worker died and the user can be claimed again.
+
+    Returns:
+        True if this caller now owns the sync
+    """
+    result = db.session.execute(
+        update(User)
+        .where(User.id == user_id)
+        .where(or_(
+            User.sync_in_progress.is_(False),
+            User.sync_in_progress.is_(None),
+            _claim_is_stale(),
+        ))
+        .values(sync_in_progress=True, sync_lease_expires_at=_lease_expiry())
+    )
+    db.session.commit()
+    return result.rowcount == 1
+
+
+def renew_sync_lease(user_id: int):
+    """Push back the lease of a running sync. Does not commit."""
+    db.session.execute(
+        update(User)
+        .where(User.id == user_id, User.sync_in_progress.is_(True))
+        .values(sync_lease_expires_at=_lease_expiry())
+    )
+
+
+def release_sync(user_id: int):
+    """Clear a user's sync claim, discarding any failed transaction first."""
+    db.session.rollback()
+    db.session.execute(
+        update(User).where(User.id == user_id).values(sync_in_progress=False, sync_lease_expires_at=None)
+    )
+    db.session.commit()
+
+
+def get_sync_state(user_id: int) -> dict:
+    """Read a user's sync state from the database (it changes in worker processes).
+
+    Returns:
+        Dict with sync_in_progress and last_sync (ISO timestamp or None)
+    """
+    row = db.session.query(
+        User.sync_in_progress, User.sync_lease_expires_at, User.last_sync_at
+    ).filter(User.id == user_id).first()
+    if row is None:
+        return {"sync_in_progress": False, "last_sync": None}
+    in_progress, lease_expires_at, last_sync_at = row
+    return {
+        "sync_in_progress": bool(in_progress and lease_expires_at and datetime.utcnow() < lease_expires_at),
+        "last_sync": last_sync_at.isoformat() if last_sync_at else None,
+    }
+
+
+def recover_stale_syncs() -> int:
+    """
+    Release claims left behind by crashed workers.
+
+    Returns:
+        Number of users whose expired claim was cleared
+    """
+    result = db.session.execute(
+        update(User)
+        .where(User.sync_in_progress.is_(True), _claim_is_stale())
+        .values(sync_in_progress=False, sync_lease_expires_at=None)
+    )
+    db.session.commit()
+    return result.rowcount
+
+
+def sync_user_items(user_id: int, full_sync: bool = False, mode: str = "saved",
+                    since_days: int = None, force_prune: bool = False) -> dict:
     """
     Sync saved items for a user. Can be called directly or queued via RQ.
 
     Args:
         user_id: The user's database ID
         full_sync: Whether to do a full sync or incremental
+        mode: "saved" crawls the saved listing; "metadata" only refreshes
+            score/num_comments of stored items via /api/info
+        since_days: In metadata mode, only refresh items created this recently
+        force_prune: On a full sync, prune past SYNC_PRUNE_MAX_FRACTION
 
     Returns:
         Dict with status and counts
@@ -196,38 +600,36 @@ def sync_user_items(user_id: int, full_sync: bool = False) -> dict:
     if not user:
         return {"error": "User not found"}
 
-    if user.sync_in_progress:
+    if not claim_sync(user_id):
         return {"error": "Sync already in progress"}
 
-    user.sync_in_progress = True
-    db.session.commit()
-
     try:
         # Check if token needs refresh
         if user.is_token_expired():
             from .auth import refresh_access_token
             if not refresh_access_token(user):
-                user.sync_in_progress = False
-                db.session.commit()
+                release_sync(user_id)
                 return {"error": "Token refresh failed"}
 
         sync_service = RedditSyncService(user, current_app.config)
-        new_count, updated_count = sync_service.sync_saved_items(full_sync)
+        http_before = sync_service.transport.snapshot()
+        if mode == "metadata":
+            since = datetime.utcnow() - timedelta(days=since_days) if since_days else None
+            result = sync_service.refresh_metadata(since)
+            release_sync(user_id)
+        else:
+            result = sync_service.sync_saved_items(full_sync, force_prune=force_prune)
+        current_app.logger.info("Sync for user %s finished: %s, http %s",
+                                user_id, result, sync_service.transport.since(http_before))
 
-        return {
-            "status": "success",
-            "new_items": new_count,
-            "updated_items": updated_count,
-        }
+        return {"status": "success", **result}
 
     except RedditAPIError as e:
-        user.sync_in_progress = False
-        db.session.commit()
+        release_sync(user_id)
         return {"error": str(e)}
 
     except Exception as e:
-        user.sync_in_progress = False
-        db.session.commit()
+        release_sync(user_id)
         current_app.logger.error(f"Sync error for user {user_id}: {e}")
         return {"error": str(e)}
 
@@ -262,19 +664,81 @@ def unsave_user_item(user_id: int, item_id: str) -> dict:
             if not refresh_access_token(user):
                 return {"error": "Token refresh failed"}
 
-        # Unsave on Reddit
-        sync_service = RedditSyncService(user, current_app.config)
+        # Unsave on Reddit; this runs in a web request, so don't queue behind
+        # a drained rate limit
+        sync_service = RedditSyncService(
+            user, current_app.config, limit_wait=current_app.config.get("REDDIT_REQUEST_MAX_WAIT", 5),
+        )
         sync_service.unsave_item(item.reddit_fullname)
 
         # Remove from local database
+        apply_facet_deltas(user_id, facet_deltas([item], sign=-1))
+        bump_data_version(user_id)
         db.session.delete(item)
         db.session.commit()
 
         return {"status": "success"}
 
-    except RedditAPIError as e:
+    except (RedditAPIError, RateLimitWaitTooLong) as e:
         return {"error": str(e)}
 
     except Exception as e:
         current_app.logger.error(f"Unsave error for user {user_id}, item {item_id}: {e}")
         return {"error": str(e)}
+
+
+def recategorize_items(user_id: int = None) -> dict:
+    """
+    Re-apply the category mapping to stored items.
+
+    Upserts never change an existing row's category, so items keep the
+    category they were first synced with until this runs. Categories
+    depend only on the subreddit, so each distinct subreddit is mapped
+    once and the rows that change are rewritten with one UPDATE per target
+    category. Affected users get their facets rebuilt and their data
+    version bumped.
+
+    Args:
+        user_id: Only recategorize this user's items
+
+    Returns:
+        Dict with updated_items and users
+    """
+    scope = [SavedItem.user_id == user_id] if user_id else []
+    pairs = db.session.query(SavedItem.subreddit, SavedItem.category).filter(*scope).distinct().all()
+    categories = categorize_many(subreddit for subreddit, _ in pairs)
+
+    moves = defaultdict(set)
+    for (subreddit, current), category in zip(pairs, categories):
+        if current != category:
+            moves[category].add(subreddit)
+    if not moves:
+        return {"updated_items": 0, "users": 0}
+
+    updated, user_ids = 0, set()
+    for category, subreddits in moves.items():
+        changed = [
+            *scope,
+            SavedItem.subreddit.in_(sorted(subreddits)),
+            or_(SavedItem.category.is_(None), SavedItem.category != category),
+        ]
+        user_ids.update(uid for (uid,) in db.session.query(SavedItem.user_id).filter(*changed).distinct())
+        result = db.session.execute(
+            update(SavedItem).where(*changed).values(category=category)
+            .execution_options(synchronize_session=False)
+        )
+        updated += result.rowcount
+
+    for uid in user_ids:
+        rebuild_facets(uid)
+        bump_data_version(uid)
+    db.session.commit()
+    return {"updated_items": updated, "users": len(user_ids)}
+
+
+@click.command("recategorize")
+@click.option("--user-id", type=int, default=None, help="Only recategorize this user's items.")
+def recategorize_command(user_id):
+    """Re-apply the subreddit category mapping to saved items."""
+    result = recategorize_items(user_id)
+    click.echo(f"Recategorized {result['updated_items']} item(s) for {result['users']} user(s)")
@@ -0,0 +1,166 @@
+"""Shared HTTP transport for Reddit API calls.
+
+One pooled requests.Session is reused by every sync and auth call so
+connections stay alive between pages, and transient failures are retried
+with jittered exponential backoff instead of fixed sleeps.
+"""
+
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Status codes worth retrying: rate limiting and transient server errors
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+# Methods that are safe to send again after a failure
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+
+class RedditTransport:
+    """Keep-alive HTTP client with bounded, header-aware retries."""
+
+    def __init__(
+        self,
+        connect_timeout: float = 5,
+        read_timeout: float = 30,
+        max_retries: int = 3,
+        backoff_base: float = 1.0,
+        backoff_cap: float = 30.0,
+        max_wait: float = 60.0,
+        pool_size: int = 10,
+    ):
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.max_wait = max_wait
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+        self.stats = {"requests": 0, "retries": 0, "sleep_seconds": 0.0}
+        self._stats_lock = threading.Lock()
+
+    def request(self, method: str, url: str, limiter=None, limit_key: str = None,
+                idempotent: bool | None = None, limit_wait: float | None = None,
+                **kwargs) -> requests.Response:
+        """
+        Send a request, retrying connection errors, 429s and 5xx responses.
+
+        Only idempotent requests are retried: by default those whose method
+        is in IDEMPOTENT_METHODS. A POST the server may already have acted
+        on (such as a one-time OAuth code exchange) is sent once unless the
+        caller passes idempotent=True.
+
+        When a limiter is given, every attempt first takes a token for
+        limit_key (waiting at most limit_wait seconds, if set) and feeds the
+        response's rate-limit headers back into it. A 429's delay is then
+        applied to the limiter's bucket rather than slept here, so the wait
+        happens once and every worker sharing the bucket honours it.
+
+        Returns the last response once it is not retryable or retries are
+        exhausted. Connection errors on the final attempt are re-raised.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        if idempotent is None:
+            idempotent = method.upper() in IDEMPOTENT_METHODS
+        max_retries = self.max_retries if idempotent else 0
+
+        for attempt in range(max_retries + 1):
+            if limiter is not None:
+                limiter.acquire(limit_key, sleep=self.sleep, max_wait=limit_wait)
+            self._count("requests")
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == max_retries:
+                    raise
+                delay = self._backoff(attempt)
+            else:
+                if limiter is not None:
+                    limiter.observe(limit_key, response.headers)
+                if response.status_code not in RETRY_STATUSES or attempt == max_retries:
+                    return response
+                delay = self._retry_delay(response, attempt)
+                if delay is None:
+                    return response
+                if limiter is not None and response.status_code == 429:
+                    limiter.defer(limit_key, delay)
+                    delay = 0
+
+            self._count("retries")
+            self.sleep(delay)
+
+        return response
+
+    def sleep(self, seconds: float):
+        """Sleep and record the time spent waiting."""
+        if seconds <= 0:
+            return
+        self._count("sleep_seconds", seconds)
+        time.sleep(seconds)
+
+    def _retry_delay(self, response: requests.Response, attempt: int) -> float | None:
+        """Delay before retrying a response, or None if the wait is too long."""
+        delay = _header_seconds(response.headers.get("Retry-After"))
+        if delay is None and response.status_code == 429:
+            delay = _header_seconds(response.headers.get("x-ratelimit-reset"))
+        if delay is None:
+            return self._backoff(attempt)
+        if delay > self.max_wait:
+            return None
+        return delay
+
+    def _backoff(self, attempt: int) -> float:
+        """Exponential backoff with jitter so concurrent retries spread out."""
+        delay = min(self.backoff_cap, self.backoff_base * (2 ** attempt))
+        return delay * random.uniform(0.5, 1.0)
+
+    def _count(self, key: str, amount: float = 1):
+        with self._stats_lock:
+            self.stats[key] += amount
+
+    def snapshot(self) -> dict:
+        """Copy of the process-wide, cumulative request, retry and sleep counters."""
+        with self._stats_lock:
+            return dict(self.stats)
+
+    def since(self, before: dict) -> dict:
+        """Counters accumulated since an earlier snapshot (includes concurrent callers)."""
+        now = self.snapshot()
+        return {key: now[key] - before.get(key, 0) for key in now}
+
+
+def _header_seconds(value: str | None) -> float | None:
+    """Parse a delay-in-seconds header, ignoring HTTP-date forms."""
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        return None
+
+
+_transports = {}
+_transports_lock = threading.Lock()
+
+
+def get_transport(config) -> RedditTransport:
+    """Return the process-wide transport for the given configuration."""
+    settings = (
+        config.get("REDDIT_HTTP_CONNECT_TIMEOUT", 5),
+        config.get("REDDIT_HTTP_READ_TIMEOUT", 30),
+        config.get("REDDIT_HTTP_MAX_RETRIES", 3),
+        config.get("REDDIT_HTTP_BACKOFF_BASE", 1.0),
+        config.get("REDDIT_HTTP_BACKOFF_CAP", 30.0),
+        config.get("REDDIT_HTTP_MAX_WAIT", 60.0),
+        config.get("REDDIT_HTTP_POOL_SIZE", 10),
+    )
+    with _transports_lock:
+        if settings not in _transports:
+            _transports[settings] = RedditTransport(*settings)
+        return _transports[settings]
@@ -1,122 +1,200 @@
 """Web view routes for browsing Reddit saved items."""
 
-from flask import Blueprint, render_template, request
+from flask import Blueprint, jsonify, render_template, request, url_for
 from flask_login import login_required, current_user
-from sqlalchemy import func
-from .extensions import db
+from markupsafe import Markup
+from .cache import cached_result, conditional
+from .facets import category_subreddits, facet_count, get_facets
 from .models import SavedItem
+from .pagination import keyset_page
+from .search import get_search_backend
 
 views_bp = Blueprint("views", __name__)
 
 
 @views_bp.route("/")
+@conditional
 def index():
-    """Home page with paginated recent items and subreddit nav."""
+    """Home page with cursor-paginated recent items and subreddit nav."""
     if not current_user.is_authenticated:
         return render_template("login.html")
 
     PER_PAGE = 20
 
-    page = request.args.get("page", 1, type=int)
     current_subreddit = request.args.get("subreddit", None)
 
-    subreddit_stats = db.session.query(
-        SavedItem.subreddit,
-        func.count(SavedItem.id).label("count")
-    ).filter_by(user_id=current_user.id).group_by(
-        SavedItem.subreddit
-    ).order_by(func.count(SavedItem.id).desc()).all()
-
-    subreddits = [{"name": name, "count": count} for name, count in subreddit_stats]
+    facets = get_facets(current_user.id)
+    subreddits = [
+        {"name": name, "count": count}
+        for name, count in sorted(facets["subreddit"].items(), key=lambda kv: (-kv[1], kv[0]))
+    ]
 
     query = SavedItem.query.filter_by(user_id=current_user.id)
     if current_subreddit:
         query = query.filter_by(subreddit=current_subreddit)
 
-    total = query.count()
-    pagination = query.order_by(SavedItem.created_utc.desc()).paginate(
-        page=page, per_page=PER_PAGE, error_out=False
+    if current_subreddit:
+        total = facet_count(facets, "subreddit", current_subreddit)
+    else:
+        total = facet_count(facets, "total")
+
+    page = keyset_page(
+        query, PER_PAGE,
+        after=request.args.get("after"),
+        before=request.args.get("before"),
     )
 
     return render_template(
         "index.html",
-        items=pagination.items,
-        pagination=pagination,
+        items=page["items"],
+        page=page,
         subreddits=subreddits,
         current_subreddit=current_subreddit,
         total=total,
     )
 
 
+CATEGORY_PER_PAGE = 50
+
+
+def _load_items(item_ids: list[int]) -> list[SavedItem]:
+    """Load the current user's items by primary key, keeping the given order."""
+    if not item_ids:
+        return []
+    items = SavedItem.query.filter(
+        SavedItem.user_id == current_user.id, SavedItem.id.in_(item_ids)
+    ).all()
+    position = {item_id: i for i, item_id in enumerate(item_ids)}
+    return sorted(items, key=lambda item: position[item.id])
+
+
+def _cacheable_snippets(snippets: dict) -> dict:
+    return {str(item_id): str(snippet) for item_id, snippet in snippets.items()}
+
+
+def _restore_snippets(snippets: dict) -> dict:
+    return {int(item_id): Markup(snippet) for item_id, snippet in snippets.items()}
+
+
+def _category_page(name: str, args) -> dict:
+    """
+    Fetch one page of a category listing.
+
+    Unfiltered pages walk the (created_utc, id) keyset; searches keep the
+    backend's ranking and page by offset instead. The matching ids are
+    cached per data version; the rows themselves are loaded by primary key.
+
+    Returns:
+        Dict with items, snippets and next_url (None on the last page)
+    """
+    filters = {
+        "type": args.get("type", "all"),
+        "status": args.get("status", "all"),
+        "q": args.get("q", "").lower(),
+    }
+    after = args.get("after")
+    offset = max(args.get("offset", 0, type=int), 0)
+
+    def compute():
+        query = SavedItem.query.filter_by(user_id=current_user.id, category=name)
+
+        if filters["type"] != "all":
+            query = query.filter_by(item_type=filters["type"])
+
+        if filters["status"] == "reviewed":
+            query = query.filter_by(reviewed=True)
+        elif filters["status"] == "unreviewed":
+            query = query.filter_by(reviewed=False)
+
+        backend = get_search_backend()
+        if filters["q"]:
+            rows = backend.apply(query, filters["q"]).offset(offset).limit(CATEGORY_PER_PAGE + 1).all()
+            items = rows[:CATEGORY_PER_PAGE]
+            next_args = {"offset": offset + CATEGORY_PER_PAGE} if len(rows) > CATEGORY_PER_PAGE else None
+            snippets = backend.snippets([item.id for item in items], filters["q"])
+        else:
+            page = keyset_page(query, CATEGORY_PER_PAGE, after=after)
+            items = page["items"]
+            next_args = {"after": page["next_cursor"]} if page["next_cursor"] else None
+            snippets = {}
+        return {
+            "ids": [item.id for item in items],
+            "snippets": _cacheable_snippets(snippets),
+            "next_args": next_args,
+        }
+
+    page = cached_result(
+        current_user.id, "category", {"name": name, "after": after, "offset": offset, **filters}, compute
+    )
+    next_url = None
+    if page["next_args"]:
+        next_url = url_for("views.category_items", name=name, **filters, **page["next_args"])
+    return {
+        "items": _load_items(page["ids"]),
+        "snippets": _restore_snippets(page["snippets"]),
+        "next_url": next_url,
+        **filters,
+    }
+
+
 @views_bp.route("/category/<name>")
 @login_required
+@conditional
 def category(name):
-    """View items in a category."""
-    filter_type = request.args.get("type", "all")
-    filter_status = request.args.get("status", "all")
-    search = request.args.get("q", "").lower()
-
-    query = SavedItem.query.filter_by(user_id=current_user.id, category=name)
-
-    if filter_type != "all":
-        query = query.filter_by(item_type=filter_type)
-
-    if filter_status == "reviewed":
-        query = query.filter_by(reviewed=True)
-    elif filter_status == "unreviewed":
-        query = query.filter_by(reviewed=False)
-
-    if search:
-        search_pattern = f"%{search}%"
-        query = query.filter(
-            db.or_(
-                SavedItem.title.ilike(search_pattern),
-                SavedItem.body.ilike(search_pattern),
-                SavedItem.selftext.ilike(search_pattern),
-                SavedItem.subreddit.ilike(search_pattern),
-            )
-        )
-
-    total = SavedItem.query.filter_by(user_id=current_user.id, category=name).count()
-    items = query.order_by(SavedItem.created_utc.desc()).all()
-
-    subreddits = db.session.query(SavedItem.subreddit).filter_by(
-        user_id=current_user.id, category=name
-    ).distinct().all()
-    subreddits = sorted([s[0] for s in subreddits])
+    """View the first page of items in a category."""
+    page = _category_page(name, request.args)
+    facets = get_facets(current_user.id)
 
     return render_template(
         "category.html",
         name=name,
-        items=items,
-        total=total,
-        subreddits=subreddits,
-        filter_type=filter_type,
-        filter_status=filter_status,
-        search=search,
+        items=page["items"],
+        snippets=page["snippets"],
+        next_url=page["next_url"],
+        total=facet_count(facets, "category", name),
+        subreddits=sorted(category_subreddits(facets, name)),
+        filter_type=page["type"],
+        filter_status=page["status"],
+        search=page["q"],
     )
 
 
+@views_bp.route("/category/<name>/items")
+@login_required
+@conditional
+def category_items(name):
+    """Next page of a category listing as rendered HTML for infinite scroll."""
+    page = _category_page(name, request.args)
+    html = render_template("_category_items.html", items=page["items"], snippets=page["snippets"])
+    return jsonify({"html": html, "count": len(page["items"]), "next_url": page["next_url"]})
+
+
 @views_bp.route("/search")
 @login_required
+@conditional
 def search():
     """Search across all items."""
     query_str = request.args.get("q", "").lower()
 
     if not query_str:
-        return render_template("search.html", items=[], query="", total=0)
-
-    search_pattern = f"%{query_str}%"
-    query = SavedItem.query.filter_by(user_id=current_user.id).filter(
-        db.or_(
-            SavedItem.title.ilike(search_pattern),
-            SavedItem.body.ilike(search_pattern),
-            SavedItem.selftext.ilike(search_pattern),
-            SavedItem.subreddit.ilike(search_pattern),
-        )
-    )
+        return render_template("search.html", items=[], snippets={}, query="", total=0)
 
-    total = query.count()
-    items = query.order_by(SavedItem.created_utc.desc()).limit(100).all()
+    def compute():
+        backend = get_search_backend()
+        query = backend.apply(SavedItem.query.filter_by(user_id=current_user.id), query_str)
+        item_ids = [item_id for (item_id,) in query.with_entities(SavedItem.id).limit(100)]
+        return {
+            "total": query.order_by(None).count(),
+            "ids": item_ids,
+            "snippets": _cacheable_snippets(backend.snippets(item_ids, query_str)),
+        }
 
-    return render_template("search.html", items=items, query=query_str, total=total)
+    result = cached_result(current_user.id, "search", {"q": query_str}, compute)
+
+    return render_template(
+        "search.html",
+        items=_load_items(result["ids"]),
+        snippets=_restore_snippets(result["snippets"]),
+        query=query_str,
+        total=result["total"],
+    )
@@ -0,0 +1,28 @@
+"""RQ worker entry point for background syncs.
+
+Run alongside the web app with: python -m webapp.worker
+"""
+
+import sys
+
+from .app import app
+from .extensions import get_redis
+from .jobs import QUEUE_NAME
+
+
+def main():
+    """Process queued sync jobs until interrupted."""
+    from rq import SimpleWorker
+
+    with app.app_context():
+        connection = get_redis(app)
+        if connection is None:
+            sys.exit(f"Cannot reach Redis at {app.config['REDIS_URL']}")
+
+        # SimpleWorker runs jobs in this process so they share the pushed
+        # app context and database engine instead of a forked copy.
+        SimpleWorker([QUEUE_NAME], connection=connection).work()
+
+
+if __name__ == "__main__":
+    main()